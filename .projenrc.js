@@ -199,6 +199,7 @@ class PoetryProject extends Project {
               toml: "^0.10.1",
               ...(!!options.devDependencies ? options.devDependencies : {}),
             },
+            scripts: options.scripts,
             source: options.packageRepositories,
           },
         },
@@ -226,10 +227,10 @@ class PoetryProject extends Project {
           targets: ["lint"],
           prerequisites: [".venv"],
           recipe: [
-            `poetry run mypy ${srcDir} tests`,
-            `poetry run flake8 ${srcDir} tests`,
-            `poetry run isort --check-only --profile black ${srcDir} tests`,
-            `poetry run black --check --diff ${srcDir} tests`,
+            `poetry run mypy ${srcDir} tests benchmarks`,
+            `poetry run flake8 ${srcDir} tests benchmarks`,
+            `poetry run isort --check-only --profile black ${srcDir} tests benchmarks`,
+            `poetry run black --check --diff ${srcDir} tests benchmarks`,
           ],
         },
         {
@@ -237,8 +238,8 @@ class PoetryProject extends Project {
           targets: ["fmt"],
           prerequisites: [".venv"],
           recipe: [
-            `poetry run isort --profile black ${srcDir} tests`,
-            `poetry run black ${srcDir} tests`,
+            `poetry run isort --profile black ${srcDir} tests benchmarks`,
+            `poetry run black ${srcDir} tests benchmarks`,
           ],
         },
         {
@@ -247,6 +248,22 @@ class PoetryProject extends Project {
           prerequisites: [".venv"],
           recipe: ["poetry run pytest --verbose --capture=no"],
         },
+        {
+          phony: true,
+          targets: ["bench"],
+          prerequisites: [".venv"],
+          recipe: [
+            "poetry run python -m benchmarks.run | poetry run python -m benchmarks.compare benchmarks/baseline.json -",
+          ],
+        },
+        {
+          phony: true,
+          targets: ["bench-baseline"],
+          prerequisites: [".venv"],
+          recipe: [
+            "poetry run python -m benchmarks.run > benchmarks/baseline.json",
+          ],
+        },
         {
           phony: true,
           targets: ["publish"],
@@ -550,6 +567,9 @@ const project = new PoetryProject({
     jedi: "^0.17.2",
     "typing-extensions": "^3.7.4.3",
   },
+  scripts: {
+    "synth-a-py": "synth_a_py.cli:main",
+  },
   license: "MIT",
   copyrightOwner: "Joseph Egan",
   copyrightPeriod: "2020",
@@ -0,0 +1,70 @@
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, TextIO
+
+__all__ = ["regressions"]
+
+
+def _load(path: str) -> Dict[str, Any]:
+    results: Dict[str, Any]
+    if path == "-":
+        results = json.load(sys.stdin)
+        return results
+    try:
+        with open(path) as f:
+            results = json.load(f)
+    except FileNotFoundError:
+        sys.exit(f"{path} not found, record one with `make bench-baseline`")
+    return results
+
+
+def regressions(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float,
+    out: TextIO = sys.stdout,
+) -> List[str]:
+    # compares the fastest run of each phase, which is the least noisy
+    if baseline["params"] != current["params"]:
+        print("warning: results are for different parameters", file=out)
+
+    regressed: List[str] = []
+    for phase, result in current["phases"].items():
+        before = baseline["phases"].get(phase)
+        if before is None:
+            print(f"{phase:<10} {result['min']:8.4f}s (new)", file=out)
+            continue
+        ratio = result["min"] / before["min"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressed.append(phase)
+            flag = " REGRESSION"
+        print(
+            f"{phase:<10} {before['min']:8.4f}s -> {result['min']:8.4f}s"
+            f" ({ratio - 1:+7.1%}){flag}",
+            file=out,
+        )
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare benchmark results against a baseline"
+    )
+    parser.add_argument("baseline", help="results of benchmarks.run, or - for stdin")
+    parser.add_argument("current", help="results of benchmarks.run, or - for stdin")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="slowdown flagged as a regression, as a fraction (default 0.1)",
+    )
+    args = parser.parse_args()
+
+    if regressions(_load(args.baseline), _load(args.current), args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+from itertools import count
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Sequence
+
+from synth_a_py import (
+    Dir,
+    GitIgnore,
+    IniFile,
+    JsonFile,
+    License,
+    Project,
+    SimpleFile,
+    TomlFile,
+    YamlFile,
+)
+
+__all__ = [
+    "KINDS",
+    "TreeParams",
+    "generate",
+]
+
+
+class TreeParams(NamedTuple):
+    files: int = 1_000
+    depth: int = 2
+    fanout: int = 4
+    kinds: Sequence[str] = ("toml", "yaml", "ini", "gitignore", "license")
+    # keys per section of each generated object
+    size: int = 8
+
+
+def _obj(i: int, size: int) -> Dict[str, Any]:
+    return {
+        f"section{s}": {
+            "name": f"item-{i}-{s}",
+            "enabled": s % 2 == 0,
+            "count": i * size + s,
+            "ratio": s / size,
+            "tags": [f"tag{t}" for t in range(s % 4 + 1)],
+            **{f"key{k}": f"value {i} {s} {k}" for k in range(size)},
+        }
+        for s in range(max(1, size // 4))
+    }
+
+
+def _ini_obj(i: int, size: int) -> Dict[str, Any]:
+    # ini sections only hold scalars
+    return {
+        section: {key: str(value) for key, value in values.items() if key != "tags"}
+        for section, values in _obj(i, size).items()
+    }
+
+
+FileFactory = Callable[[int, int], object]
+
+# each kind may appear any number of times in a directory
+_files: Dict[str, FileFactory] = {
+    "toml": lambda i, size: TomlFile(f"file{i}.toml", _obj(i, size)),
+    "yaml": lambda i, size: YamlFile(f"file{i}.yaml", _obj(i, size)),
+    "ini": lambda i, size: IniFile(f"file{i}.ini", _ini_obj(i, size)),
+    "json": lambda i, size: JsonFile(f"file{i}.json", _obj(i, size)),
+    "simple": lambda i, size: SimpleFile(
+        f"file{i}.txt", tuple(f"line {i} {n}" for n in range(size))
+    ),
+}
+
+# each kind appears at most once a directory
+_singletons: Dict[str, FileFactory] = {
+    "gitignore": lambda i, size: GitIgnore(ignore=["*.pyc", "build/"]),
+    "license": lambda i, size: License.MIT("2020", "Joseph Egan"),
+}
+
+KINDS = [*_files, *_singletons]
+
+
+def _populate(
+    params: TreeParams, depth: int, counts: Iterator[int], ids: Iterator[int]
+) -> None:
+    kinds = [kind for kind in params.kinds if kind in _files] or ["simple"]
+    singletons = [kind for kind in params.kinds if kind in _singletons]
+
+    files = next(counts)
+    for kind in singletons[:files]:
+        _singletons[kind](next(ids), params.size)
+    for n in range(files - min(files, len(singletons))):
+        _files[kinds[n % len(kinds)]](next(ids), params.size)
+
+    if depth > 0:
+        for d in range(params.fanout):
+            with Dir(f"dir{d}"):
+                _populate(params, depth - 1, counts, ids)
+
+
+def generate(params: TreeParams) -> Project:
+    # files are spread evenly over a tree of directories, depth directories
+    # deep with fanout subdirectories each
+    directories = sum(params.fanout**d for d in range(params.depth + 1))
+    per_dir, extra = divmod(params.files, directories)
+    counts = (per_dir + (1 if n < extra else 0) for n in range(directories))
+
+    spec = Project()
+    with spec:
+        _populate(params, params.depth, counts, count())
+    return spec
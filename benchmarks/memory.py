@@ -0,0 +1,68 @@
+import argparse
+import gc
+import tracemalloc
+from typing import Callable, Dict
+
+from synth_a_py import (
+    Dir,
+    EmptyFile,
+    GitIgnore,
+    IniFile,
+    JsonFile,
+    License,
+    Project,
+    SimpleFile,
+    TomlFile,
+    YamlFile,
+)
+
+NodeFactory = Callable[[int], object]
+
+factories: Dict[str, NodeFactory] = {
+    "Dir": lambda i: Dir(f"dir{i}"),
+    "EmptyFile": lambda i: EmptyFile(f"file{i}"),
+    "SimpleFile": lambda i: SimpleFile(f"file{i}", "content"),
+    "GitIgnore": lambda i: GitIgnore(),
+    "IniFile": lambda i: IniFile(f"file{i}.ini", {}),
+    "JsonFile": lambda i: JsonFile(f"file{i}.json", {}),
+    "TomlFile": lambda i: TomlFile(f"file{i}.toml", {}),
+    "YamlFile": lambda i: YamlFile(f"file{i}.yaml", {}),
+    "License": lambda i: License.MIT("2020", "Joseph Egan"),
+}
+
+# these can only appear once per directory
+singletons = {"GitIgnore", "License"}
+
+
+def bytes_per_node(factory: NodeFactory, singleton: bool, count: int) -> float:
+    spec = Project()
+    with spec:
+        containers = [Dir(f"container{i}") for i in range(count)] if singleton else []
+        gc.collect()
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        if singleton:
+            for i, container in enumerate(containers):
+                with container:
+                    factory(i)
+        else:
+            for i in range(count):
+                factory(i)
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return (after - before) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure memory used per node")
+    parser.add_argument("--count", type=int, default=10_000)
+    args = parser.parse_args()
+
+    for name, factory in factories.items():
+        size = bytes_per_node(factory, name in singletons, args.count)
+        print(f"{name:<12} {size:8.1f} bytes/node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from synth_a_py import Project
+
+from .generate import KINDS, TreeParams, generate
+
+__all__ = ["PHASES", "run"]
+
+# write and rewrite render the files again, as synth does
+PHASES = ["construct", "walk", "render", "write", "rewrite"]
+
+
+def _time(f: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    f()
+    return time.perf_counter() - start
+
+
+def run(params: TreeParams, repeat: int) -> Dict[str, List[float]]:
+    # each repeat times every phase on a newly constructed project, so caches
+    # built by one phase are only reused by the phases after it
+    timings: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+    for _ in range(repeat):
+        projects: List[Project] = []
+        timings["construct"].append(_time(lambda: projects.append(generate(params))))
+        spec = projects[0]
+        timings["walk"].append(_time(lambda: list(spec.walk())))
+        timings["render"].append(_time(spec.render))
+        with tempfile.TemporaryDirectory() as temp:
+            root = Path(temp)
+            timings["write"].append(_time(lambda: spec.synth(root)))
+            timings["rewrite"].append(_time(lambda: spec.synth(root, incremental=True)))
+    return timings
+
+
+def main() -> None:
+    defaults = TreeParams()
+    parser = argparse.ArgumentParser(
+        description="Time each phase of synthing a generated project, as JSON"
+    )
+    parser.add_argument("--files", type=int, default=defaults.files)
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--fanout", type=int, default=defaults.fanout)
+    parser.add_argument(
+        "--kinds",
+        default=",".join(defaults.kinds),
+        help=f"comma separated, from {', '.join(KINDS)}",
+    )
+    parser.add_argument("--size", type=int, default=defaults.size)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    kinds = args.kinds.split(",")
+    unknown = set(kinds).difference(KINDS)
+    if unknown:
+        parser.error(f"unknown kinds: {', '.join(sorted(unknown))}")
+    params = TreeParams(args.files, args.depth, args.fanout, kinds, args.size)
+
+    timings = run(params, args.repeat)
+
+    for phase, runs in timings.items():
+        print(f"{phase:<10} {min(runs):8.4f}s", file=sys.stderr)
+    json.dump(
+        {
+            "params": params._asdict(),
+            "python": platform.python_version(),
+            "phases": {
+                phase: {
+                    "min": min(runs),
+                    "median": statistics.median(runs),
+                    "runs": runs,
+                }
+                for phase, runs in timings.items()
+            },
+        },
+        sys.stdout,
+        indent=2,
+    )
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import timeit
+from typing import Any, Dict
+
+from synth_a_py import serializers
+
+
+def pyproject(dependencies: int) -> Dict[str, Any]:
+    return {
+        "build-system": {
+            "requires": ["poetry-core>=1.0.0"],
+            "build-backend": "poetry.core.masonry.api",
+        },
+        "tool": {
+            "poetry": {
+                "name": "my-project",
+                "version": "0.1.0",
+                "description": "It's a great project",
+                "authors": ["Joseph Egan <...>"],
+                "license": "MIT",
+                "readme": "README.md",
+                "classifiers": [f"Classifier :: {i}" for i in range(10)],
+                "dependencies": {
+                    "python": "^3.6",
+                    **{f"dep{i}": f"^{i}.0" for i in range(dependencies)},
+                    "extra": {"version": "1.0.0", "extras": ["blue", "green"]},
+                },
+                "dev-dependencies": {
+                    f"dev-dep{i}": f"^{i}.0" for i in range(dependencies)
+                },
+                "scripts": {"my-project": "my_project.cli:main"},
+            },
+            "black": {"line-length": 88, "target-version": ["py36"]},
+            "isort": {"profile": "black", "known_first_party": ["my_project"]},
+            "mypy": {
+                "strict": True,
+                "overrides": [
+                    {"module": f"untyped{i}.*", "ignore_missing_imports": True}
+                    for i in range(5)
+                ],
+            },
+            "pytest": {"ini_options": {"addopts": "-q", "testpaths": ["tests"]}},
+        },
+    }
+
+
+def lockfile(packages: int) -> Dict[str, Any]:
+    return {
+        "package": [
+            {
+                "name": f"package{i}",
+                "version": f"{i}.0.0",
+                "optional": False,
+                "python-versions": ">=3.6",
+                "dependencies": {f"package{j}": f">={j}" for j in range(i % 5)},
+            }
+            for i in range(packages)
+        ],
+        "metadata": {
+            "lock-version": "1.1",
+            "content-hash": "0" * 64,
+            "files": {
+                f"package{i}": [
+                    {"file": f"package{i}-{i}.0.0.tar.gz", "hash": f"sha256:{i:064}"}
+                ]
+                for i in range(packages)
+            },
+        },
+    }
+
+
+def workflow(jobs: int) -> Dict[str, Any]:
+    return {
+        "name": "ci",
+        "on": {"pull_request": {"branches": ["main"]}, "push": {"branches": ["main"]}},
+        "jobs": {
+            f"job{i}": {
+                "runs-on": "${{ matrix.os }}",
+                "strategy": {
+                    "matrix": {
+                        "os": ["ubuntu-latest", "macos-latest"],
+                        "python-version": ["3.6", "3.7", "3.8", "3.9"],
+                    },
+                },
+                "steps": [
+                    {"uses": "actions/checkout@v2"},
+                    {
+                        "uses": "actions/setup-python@v2",
+                        "with": {"python-version": "${{ matrix.python-version }}"},
+                    },
+                    {"run": "pip install poetry\npoetry install\n"},
+                    {"name": f"Test {i}", "run": f"make test-{i}"},
+                ],
+            }
+            for i in range(jobs)
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Time each registered serializer on realistic shapes"
+    )
+    parser.add_argument("--size", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    shapes = {
+        ("toml", "pyproject"): pyproject(args.size),
+        ("toml", "lockfile"): lockfile(args.size),
+        ("yaml", "workflow"): workflow(args.size),
+    }
+    for (format, shape), obj in shapes.items():
+        baseline = None
+        for name in serializers.names(format):
+            serializer = serializers.get(format, name)
+            seconds = timeit.timeit(
+                lambda: "".join(serializer(obj)), number=args.repeat
+            )
+            per_call = seconds / args.repeat * 1000
+            baseline = baseline or per_call
+            print(
+                f"{format:<4} {shape:<10} {name:<6} {per_call:8.3f} ms/dump"
+                f" {baseline / per_call:6.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
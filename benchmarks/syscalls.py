@@ -0,0 +1,106 @@
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Counter, Dict, List, Optional, cast
+
+from synth_a_py import Dir, Project, SimpleFile
+from synth_a_py.writer import WriterBackend
+
+backends: List[WriterBackend] = ["path", "dirfd"]
+
+
+def project(count: int, per_dir: int) -> Project:
+    spec = Project()
+    with spec:
+        for i in range(0, count, per_dir):
+            with Dir(f"dir{i // per_dir}"):
+                for j in range(i, min(i + per_dir, count)):
+                    SimpleFile(f"file{j}.txt", f"content {j}")
+    return spec
+
+
+def run(
+    backend: Optional[WriterBackend], root: Path, count: int, per_dir: int
+) -> float:
+    spec = project(count, per_dir)
+    start = time.perf_counter()
+    if backend is not None:
+        spec.synth(root, writer=backend)
+    return time.perf_counter() - start
+
+
+def strace(args: List[str]) -> Counter[str]:
+    # counts syscalls made by this script run with args under strace
+    with tempfile.NamedTemporaryFile("r") as output:
+        subprocess.run(
+            ["strace", "-f", "-c", "-o", output.name]
+            + [sys.executable, "-m", "benchmarks.syscalls"]
+            + args,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        counts: Counter[str] = Counter()
+        for line in output:
+            fields = line.split()
+            # % time, seconds, usecs/call, calls, [errors,] syscall
+            if len(fields) >= 5 and fields[3].isdigit() and fields[-1] != "total":
+                counts[fields[-1]] = int(fields[3])
+        return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compare the syscalls made by each writer backend"
+    )
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--per-dir", type=int, default=100)
+    parser.add_argument("--run", choices=["none", *backends], help=argparse.SUPPRESS)
+    parser.add_argument("--root", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run is not None:
+        # a single run, traced by the parent process
+        backend = None if args.run == "none" else cast(WriterBackend, args.run)
+        run(backend, args.root, args.count, args.per_dir)
+        return
+
+    traced = shutil.which("strace") is not None
+    if not traced:
+        print("strace not found, only timing each backend", file=sys.stderr)
+
+    baseline: Counter[str] = Counter()
+    results: Dict[str, Counter[str]] = dict()
+    with tempfile.TemporaryDirectory() as temp:
+        for backend in backends:
+            root = Path(temp) / backend
+            common = ["--count", str(args.count), "--per-dir", str(args.per_dir)]
+            common += ["--root", str(root)]
+            for name in ("new", "existing"):
+                if name == "new":
+                    shutil.rmtree(root, ignore_errors=True)
+                elapsed = run(backend, root, args.count, args.per_dir)
+                print(f"{backend:<6} {name:<9} {elapsed:8.3f}s")
+
+                if traced:
+                    if not baseline:
+                        baseline = strace(common + ["--run", "none"])
+                    if name == "new":
+                        shutil.rmtree(root)
+                    results[f"{backend} {name}"] = strace(common + ["--run", backend])
+
+    for label, counts in results.items():
+        # syscalls made by the synth, less those made starting up
+        counts.subtract(baseline)
+        total = sum(count for count in counts.values() if count > 0)
+        print(f"\n{label}: {total / args.count:.2f} syscalls/file")
+        for syscall, count in counts.most_common(8):
+            if count > 0:
+                print(f"  {syscall:<12} {count:8}")
+
+
+if __name__ == "__main__":
+    main()
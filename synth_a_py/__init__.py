@@ -1,22 +1,43 @@
 __version__ = "1.6.0"
 
-from .base import Dir, File, Project
-from .file import EmptyFile, SimpleFile
+from .base import (
+    CheckResult,
+    Dir,
+    File,
+    Project,
+    RenderEvent,
+    SynthError,
+    SynthObserver,
+    SynthSummary,
+    WriteEvent,
+)
+from .file import EmptyFile, SerializedFile, SimpleFile
 from .gitignore import GitIgnore
 from .ini import IniFile
+from .json import JsonFile
 from .license import License
 from .toml import TomlFile
+from .trace import ChromeTrace
 from .yaml import YamlFile
 
 __all__ = [
+    "CheckResult",
+    "ChromeTrace",
     "Dir",
     "EmptyFile",
     "File",
     "GitIgnore",
     "IniFile",
+    "JsonFile",
     "License",
     "Project",
+    "RenderEvent",
+    "SerializedFile",
     "SimpleFile",
+    "SynthError",
+    "SynthObserver",
+    "SynthSummary",
     "TomlFile",
+    "WriteEvent",
     "YamlFile",
 ]
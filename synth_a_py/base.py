@@ -1,46 +1,116 @@
+import asyncio
+import fnmatch
+import multiprocessing
+import os
+import pickle
+import re
+import sys
+import threading
 from abc import abstractmethod
-from contextvars import ContextVar, Token
-from pathlib import Path
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextvars import ContextVar, Token, copy_context
+from difflib import unified_diff
+from functools import partial
+from hashlib import sha256
+from pathlib import Path, PurePath, PurePosixPath
+from threading import get_ident
+from time import perf_counter
 from types import TracebackType
-from typing import TYPE_CHECKING, Callable, Dict, Iterator, Optional, Tuple, Type, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ClassVar,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
-from returns.functions import compose
+from typing_extensions import Literal
 
+from .manifest import Manifest
 from .utils import init_mix_ins
+from .writer import (
+    DirFdWriter,
+    Durability,
+    Writer,
+    WriterBackend,
+    compare,
+    open_writer,
+)
 
 __all__ = [
+    "CheckResult",
     "File",
     "Project",
     "Dir",
+    "RenderEvent",
+    "SynthError",
+    "SynthObserver",
+    "SynthSummary",
+    "WriteEvent",
 ]
 
 
-PathResolver = Callable[[Path], Path]
-
-
 class _FileContainerMixIn:
+    __slots__ = ("__store", "__index", "__subpaths")
+
     def __init__(self) -> None:
         self.__store: Dict[str, Union[File, Dir]] = dict()
+        # paths of all files in the subtree, in walk order; built on demand for
+        # the container asked, and dropped whenever a file or directory is added
+        # to the subtree
+        self.__index: Optional[Dict[PurePosixPath, File]] = None
+        self.__subpaths: Optional[Tuple[str, ...]] = None
 
     def add(self, item: Union["File", "Dir"]) -> None:
         assert item.name not in self.__store
         self.__store[item.name] = item
 
-    def walk(self) -> Iterator[Tuple[PathResolver, "File"]]:
-        item: Union[File, Dir]
-        for item in self.__store.values():
-
-            def path_resolver(path: Path) -> Path:
-                return path / item.name
+        container: Optional[_FileContainerMixIn] = self
+        while container is not None:
+            container.__index = None
+            container.__subpaths = None
+            container = container.parent if isinstance(container, Dir) else None
 
+    def __entries(self) -> Iterator[Tuple[str, "File"]]:
+        # the files in the subtree, without building listings for subdirectories
+        for item in self.__store.values():
             if isinstance(item, File):
-                yield path_resolver, item
+                yield item.name, item
             else:
-                for subpath_resolver, subitem in item.walk():
-                    yield compose(path_resolver, subpath_resolver), subitem
+                prefix = f"{item.name}/"
+                for subpath, subitem in item.__entries():
+                    yield prefix + subpath, subitem
+
+    def __get_index(self) -> Dict[PurePosixPath, "File"]:
+        if self.__index is None:
+            self.__index = {
+                PurePosixPath(subpath): item for subpath, item in self.__entries()
+            }
+        return self.__index
+
+    def walk(self) -> Iterator[Tuple[PurePosixPath, "File"]]:
+        return iter(self.__get_index().items())
 
-    def subpaths(self) -> Iterator[str]:
-        return (str(path_resolver(Path("."))) for path_resolver, _ in self.walk())
+    def subpaths(self) -> Tuple[str, ...]:
+        if self.__subpaths is None:
+            self.__subpaths = tuple(subpath for subpath, _ in self.__entries())
+        return self.__subpaths
+
+    def get(self, path: Union[str, PurePath]) -> Optional["File"]:
+        return self.__get_index().get(PurePosixPath(path))
 
 
 if TYPE_CHECKING:
@@ -78,23 +148,90 @@ def _context_reset(token: _ContextToken) -> None:
 
 
 class _ChildMixIn:
+    __slots__ = ()
+
+    # set by the concrete node classes, which hold it in a slot
+    parent: _FileContainerMixIn
+
     def __init__(self) -> None:
-        self.parent = _context_get()
         assert isinstance(self, File) or isinstance(self, Dir)
         self.parent.add(self)
 
 
 class File(_ChildMixIn):
+    __slots__ = ("name", "parent", "__rendered")
+
+    # whether synth_content only depends on the file itself, and not on the
+    # rest of the project, so it can be rendered in another process
+    detachable: ClassVar[bool] = True
+
+    # whether render() should reuse the last rendered content while
+    # cache_key() is unchanged
+    memoize: ClassVar[bool] = False
+
     def __init__(self, name: str) -> None:
         self.name = name
+        self.parent = _context_get()
+        self.__rendered: Optional[Tuple[Any, str]] = None
         init_mix_ins(self, File)
 
     @abstractmethod
     def synth_content(self) -> str:
         ...
 
+    def synth_chunks(self) -> Iterator[str]:
+        yield self.synth_content()
+
+    def cache_key(self) -> Any:
+        # a value that compares equal for as long as synth_content would return
+        # the same content, or None if that can't be told
+        return None
+
+    def render(self) -> str:
+        key, content = self._cached()
+        if content is None:
+            content = self.synth_content()
+            self._cache(key, content)
+        return content
+
+    def render_chunks(self) -> Iterator[str]:
+        if self.memoize or not _streams(type(self)):
+            return iter((self.render(),))
+        return self.synth_chunks()
+
+    def _cached(self) -> Tuple[Any, Optional[str]]:
+        if not self.memoize:
+            return None, None
+
+        key = self.cache_key()
+        if key is None or self.__rendered is None or self.__rendered[0] != key:
+            return key, None
+        return key, self.__rendered[1]
+
+    def _cache(self, key: Any, content: str) -> None:
+        if key is not None:
+            self.__rendered = (key, content)
+
+
+_streaming_types: Dict[type, bool] = dict()
+
+
+def _streams(file_type: type) -> bool:
+    # only stream when synth_chunks is overridden at least as far down as
+    # synth_content, so subclasses that only override synth_content still work
+    if file_type not in _streaming_types:
+        for t in file_type.__mro__:
+            if "synth_chunks" in vars(t) or "synth_content" in vars(t):
+                _streaming_types[file_type] = (
+                    "synth_chunks" in vars(t) and t is not File
+                )
+                break
+    return _streaming_types.get(file_type, False)
+
 
 class _ContextMixIn(_FileContainerMixIn):
+    __slots__ = ("__context_token",)
+
     def __init__(self) -> None:
         self.__context_token: Optional[_ContextToken] = None
         init_mix_ins(self, _ContextMixIn)
@@ -117,28 +254,695 @@ class _ContextMixIn(_FileContainerMixIn):
         self.__context_token = None
 
 
+class SynthSummary(NamedTuple):
+    written: int
+    unchanged: int
+    bytes_saved: int = 0
+    removed: int = 0
+
+
+WriteOutcome = Literal["written", "unchanged", "linked", "skipped", "failed"]
+
+
+class RenderEvent(NamedTuple):
+    path: Path
+    file_type: str
+    start: float
+    end: float
+    size: int
+    pid: int
+    thread: int
+
+
+class WriteEvent(NamedTuple):
+    path: Path
+    start: float
+    end: float
+    outcome: WriteOutcome
+    pid: int
+    thread: int
+
+
+class SynthObserver:
+    # told about each file as Project.synth renders and writes it, with times
+    # from time.perf_counter, possibly from several threads at once
+    def rendered(self, event: RenderEvent) -> None:
+        pass
+
+    def written(self, event: WriteEvent) -> None:
+        pass
+
+
+def _observe_render(
+    observer: SynthObserver,
+    path: Path,
+    f: "File",
+    content: str,
+    start: float,
+    end: Optional[float] = None,
+    pid: Optional[int] = None,
+    thread: Optional[int] = None,
+) -> None:
+    observer.rendered(
+        RenderEvent(
+            path=path,
+            file_type=type(f).__name__,
+            start=start,
+            end=perf_counter() if end is None else end,
+            size=len(content.encode("utf-8")),
+            pid=os.getpid() if pid is None else pid,
+            thread=get_ident() if thread is None else thread,
+        )
+    )
+
+
+def _observe_write(
+    observer: SynthObserver, path: Path, start: float, outcome: WriteOutcome
+) -> None:
+    observer.written(
+        WriteEvent(
+            path=path,
+            start=start,
+            end=perf_counter(),
+            outcome=outcome,
+            pid=os.getpid(),
+            thread=get_ident(),
+        )
+    )
+
+
+def _slot_names(t: type) -> Iterator[str]:
+    for base in t.__mro__:
+        slots = base.__dict__.get("__slots__", ())
+        for name in (slots,) if isinstance(slots, str) else slots:
+            if name.startswith("__") and not name.endswith("__"):
+                yield f"_{base.__name__.lstrip('_')}{name}"
+            elif name not in ("__dict__", "__weakref__"):
+                yield name
+
+
+def _detach(f: File) -> Optional[bytes]:
+    if not f.detachable:
+        return None
+
+    state = dict(getattr(f, "__dict__", {}))
+    for name in _slot_names(type(f)):
+        if hasattr(f, name):
+            state[name] = getattr(f, name)
+    del state["parent"]
+    del state["_File__rendered"]
+
+    try:
+        return pickle.dumps((type(f), state))
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return None
+
+
+# content, with when and where it was rendered
+_Rendered = Tuple[str, float, float, int, int]
+
+
+def _process_pool(processes: int) -> ProcessPoolExecutor:
+    # forked workers don't run the synth.py script again, and can unpickle file
+    # classes defined in it. fork is only chosen where it's safe, on Linux and
+    # while the caller has no other threads; elsewhere the platform's default is
+    # used, and files its workers can't render are rendered locally
+    if (
+        sys.version_info >= (3, 7)
+        and sys.platform.startswith("linux")
+        and threading.active_count() == 1
+    ):
+        return ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("fork")
+        )
+    return ProcessPoolExecutor(max_workers=processes)
+
+
+def _render(payload: bytes) -> _Rendered:
+    file_type, state = pickle.loads(payload)
+    f = file_type.__new__(file_type)
+    for name, value in state.items():
+        setattr(f, name, value)
+    start = perf_counter()
+    content = cast(str, f.synth_content())
+    return content, start, perf_counter(), os.getpid(), get_ident()
+
+
+class CheckResult:
+    def __init__(
+        self,
+        root: Path,
+        missing: List[str],
+        changed: Dict[str, str],
+        extra: List[str],
+    ) -> None:
+        self.root = root
+        self.missing = missing
+        self.changed = list(changed)
+        self.extra = extra
+        self.__expected = changed
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.changed or self.extra)
+
+    def diff(self, path: str) -> str:
+        actual = (self.root / path).read_text(encoding="utf-8", errors="replace")
+        return "".join(
+            unified_diff(
+                actual.splitlines(keepends=True),
+                self.__expected[path].splitlines(keepends=True),
+                fromfile=f"a/{path}",
+                tofile=f"b/{path}",
+            )
+        )
+
+    def diffs(self) -> Iterator[str]:
+        return (self.diff(path) for path in self.changed)
+
+
+class SynthError(Exception):
+    def __init__(self, errors: Dict[Path, Exception]) -> None:
+        self.errors = errors
+        details = "".join(f"\n  {path}: {error!r}" for path, error in errors.items())
+        super().__init__(f"failed to synth {len(errors)} file(s):{details}")
+
+
+class _ObservedWriter:
+    __slots__ = ("writer", "observer")
+
+    def __init__(
+        self, writer: Union[Writer, DirFdWriter], observer: SynthObserver
+    ) -> None:
+        self.writer = writer
+        self.observer = observer
+
+    def makedirs(self, path: Path) -> None:
+        self.writer.makedirs(path)
+
+    def write(self, path: Path, content: Union[str, Iterator[str]]) -> bool:
+        start = perf_counter()
+        try:
+            written = self.writer.write(path, content)
+        except BaseException:
+            _observe_write(self.observer, path, start, "failed")
+            raise
+        _observe_write(
+            self.observer, path, start, "written" if written else "unchanged"
+        )
+        return written
+
+    def link(self, source: Path, path: Path, size: int) -> Tuple[bool, int]:
+        start = perf_counter()
+        try:
+            written, saved = self.writer.link(source, path, size)
+        except BaseException:
+            _observe_write(self.observer, path, start, "failed")
+            raise
+        # a link that couldn't be made is written as a copy, saving nothing
+        outcome: WriteOutcome = (
+            "unchanged" if not written else "linked" if saved else "written"
+        )
+        _observe_write(self.observer, path, start, outcome)
+        return written, saved
+
+
+_Writer = Union[Writer, DirFdWriter, _ObservedWriter]
+
+_Globs = Union[str, Iterable[str]]
+
+
+def _normalize_glob(glob: str) -> str:
+    # relative to the root, perhaps written with a leading ./ or a trailing /
+    glob = glob.rstrip("/")
+    while glob.startswith("./"):
+        glob = glob[2:]
+    return "*" if glob == "." else glob
+
+
+def _matcher(only: _Globs) -> Callable[[PurePosixPath], bool]:
+    # fnmatch globs, matching a file or any directory it's in
+    globs = [only] if isinstance(only, str) else list(only)
+    pattern = re.compile(
+        "|".join(fnmatch.translate(_normalize_glob(glob)) for glob in globs) or "$^"
+    )
+
+    def matches(relpath: PurePosixPath) -> bool:
+        if pattern.match(str(relpath)):
+            return True
+        return any(
+            pattern.match(str(parent)) for parent in relpath.parents if parent.name
+        )
+
+    return matches
+
+
+# a rendered file, with the file it can be linked to when deduplicating
+_Planned = Tuple[Path, Union[str, Iterator[str]], Optional[Tuple[Path, int]]]
+
+
+# called in place of Project.synth when set, as the command line does around
+# the scripts it runs, with the project, its root, whether the call asked to be
+# incremental, and a function doing the synth that takes incremental
+_SynthHook = Callable[
+    ["Project", Path, bool, Callable[..., SynthSummary]], SynthSummary
+]
+
+_synth_hook: ContextVar[Optional[_SynthHook]] = ContextVar("_synth_hook", default=None)
+
+
 class Project(_ContextMixIn):
-    def synth(self, root: Optional[Path] = None) -> None:
+    __slots__ = ()
+
+    def synth(
+        self,
+        root: Optional[Path] = None,
+        *,
+        incremental: bool = False,
+        workers: Optional[int] = None,
+        processes: Optional[int] = None,
+        dedupe: bool = False,
+        atomic: bool = False,
+        durability: Durability = "none",
+        writer: WriterBackend = "path",
+        manifest: bool = False,
+        observer: Optional[SynthObserver] = None,
+        only: Optional[_Globs] = None,
+    ) -> SynthSummary:
         if root is None:
             root = Path.cwd()
 
-        root.mkdir(parents=True, exist_ok=True)
-
-        for path_resolver, f in self.walk():
-            path = path_resolver(root)
-
-            path.parent.mkdir(parents=True, exist_ok=True)
+        synth = partial(
+            self.__synth,
+            root,
+            workers=workers,
+            processes=processes,
+            dedupe=dedupe,
+            atomic=atomic,
+            durability=durability,
+            writer=writer,
+            manifest=manifest,
+            observer=observer,
+            only=only,
+        )
+        hook = _synth_hook.get()
+        if hook is None:
+            return synth(incremental=incremental)
+        return hook(self, root, incremental, synth)
+
+    def __synth(
+        self,
+        root: Path,
+        *,
+        incremental: bool,
+        workers: Optional[int],
+        processes: Optional[int],
+        dedupe: bool,
+        atomic: bool,
+        durability: Durability,
+        writer: WriterBackend,
+        manifest: bool,
+        observer: Optional[SynthObserver],
+        only: Optional[_Globs],
+    ) -> SynthSummary:
+        previous = Manifest.load(root) if manifest else None
+        # each file's path, hash, and whether the manifest showed it unchanged
+        recorded: Dict[str, Tuple[Path, str, bool]] = dict()
+
+        written = 0
+        unchanged = 0
+        bytes_saved = 0
+        with open_writer(
+            writer, incremental=incremental, atomic=atomic, durability=durability
+        ) as opened:
+            target: _Writer = (
+                opened if observer is None else _ObservedWriter(opened, observer)
+            )
+            target.makedirs(root)
+            planned = self.__dedupe(
+                self.__render(root, processes, target, observer, only), dedupe
+            )
+            if previous is not None:
+                planned = self.__skip_recorded(
+                    planned, root, previous, incremental, recorded, observer
+                )
+            results = (
+                self.__write_serial(planned, target)
+                if workers is None
+                else self.__write_threaded(planned, target, workers)
+            )
+
+            for was_written, saved in results:
+                if was_written:
+                    written += 1
+                else:
+                    unchanged += 1
+                bytes_saved += saved
+
+        removed = 0
+        if previous is not None:
+            current = Manifest()
+            for relpath, (path, digest, skipped) in recorded.items():
+                if skipped:
+                    unchanged += 1
+                    current.entries[relpath] = previous.entries[relpath]
+                else:
+                    current.record(relpath, path, digest)
+            if only is not None:
+                # files the globs don't match are kept as they were, declared or
+                # not, so only files within the selection are pruned
+                matches = _matcher(only)
+                for relpath, entry in previous.entries.items():
+                    if relpath not in recorded and not matches(PurePosixPath(relpath)):
+                        current.entries[relpath] = entry
+            removed = len(previous.prune(root, current.entries))
+            current.save(root)
+
+        return SynthSummary(
+            written=written,
+            unchanged=unchanged,
+            bytes_saved=bytes_saved,
+            removed=removed,
+        )
+
+    async def asynth(
+        self,
+        root: Optional[Path] = None,
+        *,
+        concurrency: int = 4,
+        incremental: bool = False,
+        durability: Durability = "none",
+        writer: WriterBackend = "path",
+    ) -> SynthSummary:
+        assert concurrency > 0
+        if root is None:
+            root = Path.cwd()
 
-            # ensure writable
-            if path.is_file():
-                path.chmod(0o644)
+        loop = asyncio.get_event_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        # always atomic, so cancelling leaves each file either as it was or
+        # fully written
+        opened = open_writer(
+            writer, incremental=incremental, atomic=True, durability=durability
+        )
+        paths: List[Path] = []
+        errors: Dict[Path, Exception] = dict()
+
+        def render_and_write(path: Path, f: File) -> bool:
+            return opened.write(path, f.render_chunks())
+
+        async def run(path: Path, f: File) -> Optional[bool]:
+            try:
+                # in a copy of the caller's context, like a task
+                return await loop.run_in_executor(
+                    executor, copy_context().run, render_and_write, path, f
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                errors[path] = e
+                return None
+            finally:
+                semaphore.release()
+
+        def close() -> None:
+            # writes already started finish before the writer is closed
+            executor.shutdown()
+            opened.close()
+
+        tasks: List["asyncio.Future[Optional[bool]]"] = []
+        try:
+            await loop.run_in_executor(executor, opened.makedirs, root)
+            created = {root}
+            for relpath, f in self.walk():
+                path = root / relpath
+                if path.parent not in created:
+                    await loop.run_in_executor(executor, opened.makedirs, path.parent)
+                    created.add(path.parent)
+
+                await semaphore.acquire()
+                paths.append(path)
+                tasks.append(asyncio.ensure_future(run(path, f)))
+                # let other tasks run between files
+                await asyncio.sleep(0)
+
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            # so files not yet started are dropped from the executor's queue
+            if tasks:
+                await asyncio.wait(tasks)
+            raise
+        finally:
+            await loop.run_in_executor(None, close)
+
+        if errors:
+            raise SynthError({path: errors[path] for path in paths if path in errors})
+
+        written = sum(1 for result in results if result)
+        return SynthSummary(written=written, unchanged=len(results) - written)
+
+    def render(self, only: Optional[_Globs] = None) -> Dict[str, str]:
+        return {str(relpath): f.render() for relpath, f in self.__select(only)}
+
+    def check(self, root: Optional[Path] = None) -> CheckResult:
+        if root is None:
+            root = Path.cwd()
 
-            # write and mark read only
-            path.write_text(f.synth_content())
-            path.chmod(0o444)
+        missing: List[str] = []
+        changed: Dict[str, str] = dict()
+        declared: Set[str] = set()
+        for subpath, f in self.walk():
+            relpath = str(subpath)
+            declared.add(relpath)
+            content = f.render()
+
+            same = compare(root / subpath, content.encode("utf-8"))
+            if same is None:
+                missing.append(relpath)
+            elif not same:
+                changed[relpath] = content
+
+        # files synth has written are read only, so any other read only files
+        # alongside the declared ones are most likely left over from before
+        extra: List[str] = []
+        for parent in sorted({PurePosixPath(path).parent for path in declared}):
+            try:
+                entries = sorted(os.scandir(root / parent), key=lambda e: e.name)
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                relpath = (parent / entry.name).as_posix()
+                if (
+                    relpath not in declared
+                    and entry.is_file(follow_symlinks=False)
+                    and not entry.stat(follow_symlinks=False).st_mode & 0o222
+                ):
+                    extra.append(relpath)
+
+        # along with any files a manifest shows synth wrote, wherever they are
+        stale = set(Manifest.load(root).entries).difference(declared, extra)
+        extra.extend(sorted(relpath for relpath in stale if (root / relpath).is_file()))
+
+        return CheckResult(root, missing, changed, extra)
+
+    def __select(self, only: Optional[_Globs]) -> Iterator[Tuple[PurePosixPath, File]]:
+        if only is None:
+            return self.walk()
+        matches = _matcher(only)
+        return ((relpath, f) for relpath, f in self.walk() if matches(relpath))
+
+    def __paths(
+        self, root: Path, writer: _Writer, only: Optional[_Globs]
+    ) -> Iterator[Tuple[Path, File]]:
+        created = {root}
+        for relpath, f in self.__select(only):
+            path = root / relpath
+
+            if path.parent not in created:
+                writer.makedirs(path.parent)
+                created.add(path.parent)
+
+            yield path, f
+
+    def __render(
+        self,
+        root: Path,
+        processes: Optional[int],
+        writer: _Writer,
+        observer: Optional[SynthObserver],
+        only: Optional[_Globs],
+    ) -> Iterator[Tuple[Path, Union[str, Iterator[str]]]]:
+        if processes is None:
+            for path, f in self.__paths(root, writer, only):
+                if observer is None:
+                    yield path, f.render_chunks()
+                else:
+                    # rendered up front, so it isn't timed as part of the write
+                    start = perf_counter()
+                    content = f.render()
+                    _observe_render(observer, path, f, content, start)
+                    yield path, content
+            return
+
+        assert processes > 0
+        # rendered in walk order, either locally or by a worker process
+        pending: Deque[
+            Tuple[Path, File, Any, Union[str, "Future[_Rendered]"]]
+        ] = deque()
+
+        def render_locally(path: Path, f: File, key: Any) -> str:
+            start = perf_counter()
+            content = f.synth_content()
+            f._cache(key, content)
+            if observer is not None:
+                _observe_render(observer, path, f, content, start)
+            return content
+
+        def collect() -> Tuple[Path, str]:
+            path, f, key, content = pending.popleft()
+            if isinstance(content, Future):
+                try:
+                    rendered, start, end, pid, thread = content.result()
+                except Exception:
+                    # the worker couldn't rebuild the file, e.g. its class is
+                    # defined in a script it can't import, or the worker died;
+                    # any error from the file itself is raised again here
+                    return path, render_locally(path, f, key)
+                f._cache(key, rendered)
+                if observer is not None:
+                    _observe_render(
+                        observer, path, f, rendered, start, end, pid, thread
+                    )
+                return path, rendered
+            return path, content
+
+        with _process_pool(processes) as executor:
+            broken = False
+            for path, f in self.__paths(root, writer, only):
+                key, cached = f._cached()
+                payload = _detach(f) if cached is None and not broken else None
+                future: Optional["Future[_Rendered]"] = None
+                if payload is not None:
+                    try:
+                        future = executor.submit(_render, payload)
+                    except BrokenProcessPool:
+                        broken = True
+                if future is not None:
+                    pending.append((path, f, key, future))
+                else:
+                    if cached is None:
+                        cached = render_locally(path, f, key)
+                    pending.append((path, f, key, cached))
+                if len(pending) >= processes * 4:
+                    yield collect()
+            while pending:
+                yield collect()
+
+    def __dedupe(
+        self, rendered: Iterator[Tuple[Path, Union[str, Iterator[str]]]], dedupe: bool
+    ) -> Iterator[_Planned]:
+        if not dedupe:
+            for path, content in rendered:
+                yield path, content, None
+            return
+
+        # the first file written with each content
+        sources: Dict[bytes, Path] = dict()
+        for path, content in rendered:
+            if not isinstance(content, str):
+                content = "".join(content)
+            data = content.encode("utf-8")
+            source = sources.setdefault(sha256(data).digest(), path)
+            yield path, content, (None if source is path else (source, len(data)))
+
+    def __skip_recorded(
+        self,
+        planned: Iterator[_Planned],
+        root: Path,
+        manifest: Manifest,
+        incremental: bool,
+        recorded: Dict[str, Tuple[Path, str, bool]],
+        observer: Optional[SynthObserver],
+    ) -> Iterator[_Planned]:
+        for path, content, link in planned:
+            if not isinstance(content, str):
+                content = "".join(content)
+            digest = sha256(content.encode("utf-8")).hexdigest()
+            relpath = path.relative_to(root).as_posix()
+
+            # files whose stat is as recorded aren't read back to compare
+            skipped = (
+                incremental and link is None and manifest.matches(relpath, path, digest)
+            )
+            recorded[relpath] = (path, digest, skipped)
+            if not skipped:
+                yield path, content, link
+            elif observer is not None:
+                _observe_write(observer, path, perf_counter(), "skipped")
+
+    def __write_serial(
+        self, planned: Iterator[_Planned], writer: _Writer
+    ) -> Iterator[Tuple[bool, int]]:
+        for path, content, link in planned:
+            if link is None:
+                yield writer.write(path, content), 0
+            else:
+                source, size = link
+                yield writer.link(source, path, size)
+
+    def __write_threaded(
+        self, planned: Iterator[_Planned], writer: _Writer, workers: int
+    ) -> Iterator[Tuple[bool, int]]:
+        assert workers > 0
+        errors: Dict[Path, Exception] = dict()
+        # bound the number of rendered files held in memory awaiting a writer
+        pending: Deque[Tuple[Path, "Future[Tuple[bool, int]]"]] = deque()
+        # linked once the files they link to have been written
+        links: List[Tuple[Path, Tuple[Path, int]]] = []
+
+        def write(path: Path, content: str) -> Tuple[bool, int]:
+            return writer.write(path, content), 0
+
+        def collect() -> Iterator[Tuple[bool, int]]:
+            path, future = pending.popleft()
+            try:
+                yield future.result()
+            except Exception as e:
+                errors[path] = e
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for path, content, link in planned:
+                if link is not None:
+                    links.append((path, link))
+                    continue
+                if not isinstance(content, str):
+                    content = "".join(content)
+                pending.append((path, executor.submit(write, path, content)))
+                if len(pending) >= workers * 4:
+                    yield from collect()
+            while pending:
+                yield from collect()
+
+            for path, (source, size) in links:
+                if source in errors:
+                    errors[path] = errors[source]
+                    continue
+                future = executor.submit(writer.link, source, path, size)
+                pending.append((path, future))
+            while pending:
+                yield from collect()
+
+        if errors:
+            raise SynthError(errors)
 
 
 class Dir(_ContextMixIn, _ChildMixIn):
+    __slots__ = ("name", "parent")
+
     def __init__(self, name: str) -> None:
         self.name = name
+        self.parent = _context_get()
         init_mix_ins(self, Dir)
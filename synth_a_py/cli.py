@@ -0,0 +1,240 @@
+import argparse
+import os
+import runpy
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from textwrap import indent
+from typing import Callable, List, NamedTuple, Optional, Sequence
+
+from . import serializers
+from .base import (
+    CheckResult,
+    File,
+    Project,
+    SynthSummary,
+    _streaming_types,
+    _synth_hook,
+)
+
+__all__ = ["ScriptResult", "discover", "main", "run_script"]
+
+SCRIPT_NAME = "synth.py"
+
+# never searched for scripts, along with hidden directories
+_SKIPPED = {"__pycache__", "node_modules", "venv"}
+
+# class-level options of file types, which a script may change
+_FILE_OPTIONS = ("detachable", "memoize")
+
+
+class ScriptResult(NamedTuple):
+    path: Path
+    seconds: float
+    written: int
+    unchanged: int
+    # files not in sync, when checking
+    out_of_date: List[str]
+    error: Optional[str]
+
+
+class _Session:
+    # hooked into the Project.synth calls of a script, to pass options to them
+    # and collect their results
+    def __init__(self, *, incremental: bool = False, check: bool = False) -> None:
+        self.incremental = incremental
+        self.check = check
+        self.summaries: List[SynthSummary] = []
+        self.checks: List[CheckResult] = []
+
+    def __call__(
+        self,
+        project: Project,
+        root: Path,
+        incremental: bool,
+        synth: Callable[..., SynthSummary],
+    ) -> SynthSummary:
+        if self.check:
+            self.checks.append(project.check(root))
+            return SynthSummary(written=0, unchanged=0)
+
+        summary = synth(incremental=incremental or self.incremental)
+        self.summaries.append(summary)
+        return summary
+
+
+def discover(root: Path) -> List[Path]:
+    scripts: List[Path] = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            name
+            for name in dirnames
+            if not name.startswith(".") and name not in _SKIPPED
+        )
+        if SCRIPT_NAME in filenames:
+            scripts.append(Path(directory) / SCRIPT_NAME)
+    return scripts
+
+
+def _file_types() -> List[type]:
+    types: List[type] = [File]
+    for t in types:
+        subclasses: List[type] = t.__subclasses__()
+        for subclass in subclasses:
+            if subclass not in types:
+                types.append(subclass)
+    return types
+
+
+def _save_state() -> Callable[[], None]:
+    # state kept by synth_a_py in a worker, saved so that what one script
+    # changes doesn't leak into the next script the worker runs
+    registry = serializers._snapshot()
+    streaming = dict(_streaming_types)
+    options = {
+        t: {name: vars(t)[name] for name in _FILE_OPTIONS if name in vars(t)}
+        for t in _file_types()
+    }
+
+    def restore() -> None:
+        serializers._restore(registry)
+        _streaming_types.clear()
+        _streaming_types.update(streaming)
+        for t, saved in options.items():
+            for name in _FILE_OPTIONS:
+                if name in saved:
+                    setattr(t, name, saved[name])
+                elif name in vars(t):
+                    delattr(t, name)
+
+    return restore
+
+
+def run_script(script: Path, incremental: bool, check: bool) -> ScriptResult:
+    # runs the script as python would from its directory, but in this process
+    directory = script.parent.resolve()
+    cwd = os.getcwd()
+    path = list(sys.path)
+    argv = list(sys.argv)
+    modules = set(sys.modules)
+    restore = _save_state()
+
+    session = _Session(incremental=incremental, check=check)
+    token = _synth_hook.set(session)
+    error: Optional[str] = None
+    start = time.perf_counter()
+    try:
+        os.chdir(directory)
+        sys.path.insert(0, str(directory))
+        sys.argv = [str(script)]
+        runpy.run_path(str(script), run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            error = f"exited with {e.code}\n"
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        seconds = time.perf_counter() - start
+        _synth_hook.reset(token)
+        os.chdir(cwd)
+        sys.path[:] = path
+        sys.argv = argv
+        restore()
+        # scripts in other directories may have helper modules of the same name
+        for name in set(sys.modules).difference(modules):
+            file = getattr(sys.modules[name], "__file__", None)
+            if file is not None and directory in Path(file).resolve().parents:
+                del sys.modules[name]
+
+    out_of_date: List[str] = []
+    for result in session.checks:
+        out_of_date.extend(f"{relpath} (missing)" for relpath in result.missing)
+        out_of_date.extend(f"{relpath} (changed)" for relpath in result.changed)
+        out_of_date.extend(f"{relpath} (extra)" for relpath in result.extra)
+
+    return ScriptResult(
+        path=script,
+        seconds=seconds,
+        written=sum(summary.written for summary in session.summaries),
+        unchanged=sum(summary.unchanged for summary in session.summaries),
+        out_of_date=out_of_date,
+        error=error,
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="synth-a-py",
+        description=f"Run every {SCRIPT_NAME} found under a directory",
+    )
+    parser.add_argument("root", nargs="?", type=Path, default=Path("."))
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only write files whose content changed",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="report projects that aren't in sync instead of writing them",
+    )
+    args = parser.parse_args(argv)
+
+    root = args.root.resolve()
+    scripts = discover(root)
+    if not scripts:
+        print(f"no {SCRIPT_NAME} found under {root}", file=sys.stderr)
+        return 1
+
+    failed = 0
+    stale = 0
+    start = time.perf_counter()
+    # each worker imports synth_a_py and its dependencies once, for all the
+    # scripts it runs
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        results = executor.map(
+            run_script, scripts, repeat(args.incremental), repeat(args.check)
+        )
+        for result in results:
+            name = result.path.relative_to(root)
+            if result.error is not None:
+                failed += 1
+                print(f"{result.seconds:7.2f}s {name}: failed")
+                print(indent(result.error, "    "), end="")
+            elif args.check:
+                if result.out_of_date:
+                    stale += 1
+                    print(f"{result.seconds:7.2f}s {name}: out of date")
+                    for relpath in result.out_of_date:
+                        print(f"    {relpath}")
+                else:
+                    print(f"{result.seconds:7.2f}s {name}: in sync")
+            else:
+                print(
+                    f"{result.seconds:7.2f}s {name}:"
+                    f" {result.written} written, {result.unchanged} unchanged"
+                )
+    elapsed = time.perf_counter() - start
+
+    problems = [f"{failed} failed"] if failed else []
+    if stale:
+        problems.append(f"{stale} out of date")
+    print(
+        f"{len(scripts)} projects in {elapsed:.2f}s"
+        + (f": {', '.join(problems)}" if problems else "")
+    )
+    return 1 if failed or stale else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
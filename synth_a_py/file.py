@@ -1,28 +1,82 @@
-from typing import Tuple, Union
+from typing import Any, Callable, ClassVar, Iterator, Optional, Tuple, Union
 
+from . import serializers
 from .base import File
-from .utils import ensure_nl
+from .utils import Lazy, ensure_nl, fingerprint
 
 __all__ = [
     "EmptyFile",
+    "SerializedFile",
     "SimpleFile",
 ]
 
 
 class EmptyFile(File):
+    __slots__ = ()
+
     def synth_content(self) -> str:
         return ""
 
+    def cache_key(self) -> Any:
+        return ()
+
+
+_Content = Union[str, Tuple[str, ...]]
+
 
 class SimpleFile(File):
-    def __init__(self, name: str, content: Union[str, Tuple[str, ...]]):
+    __slots__ = ("_content",)
+
+    content = Lazy("_content")
+
+    def __init__(self, name: str, content: Union[_Content, Callable[[], _Content]]):
         super().__init__(name)
         self.content = content
 
     def synth_content(self) -> str:
+        return "".join(self.synth_chunks())
+
+    def synth_chunks(self) -> Iterator[str]:
         if isinstance(self.content, str):
-            return ensure_nl(self.content)
+            yield ensure_nl(self.content)
         elif isinstance(self.content, tuple):
-            return "".join(map(ensure_nl, self.content))
+            yield from map(ensure_nl, self.content)
+        else:
+            raise TypeError(f"Unexpected type: {type(self.content)}")
+
+    def cache_key(self) -> Any:
+        return self.content
+
+
+class SerializedFile(File):
+    __slots__ = ("_obj", "serializer")
+
+    # set by subclasses, to the format in synth_a_py.serializers they dump
+    format: ClassVar[str]
+
+    obj = Lazy("_obj")
+
+    def __init__(
+        self,
+        name: str,
+        obj: Union[Any, Callable[[], Any]],
+        *,
+        serializer: Optional[str] = None,
+    ):
+        if serializer is not None:
+            serializers.get(self.format, serializer)
+        super().__init__(name)
+        self.obj = obj
+        self.serializer = serializer
+
+    def __serializer(self) -> str:
+        return self.serializer or serializers.get_default(self.format)
+
+    def synth_content(self) -> str:
+        return "".join(self.synth_chunks())
+
+    def synth_chunks(self) -> Iterator[str]:
+        return serializers.get(self.format, self.__serializer())(self.obj)
 
-        raise TypeError(f"Unexpected type: {type(self.content)}")
+    def cache_key(self) -> Any:
+        return (self.__serializer(), fingerprint(self.obj))
@@ -1,5 +1,4 @@
-from pathlib import Path
-from typing import List, Optional
+from typing import Any, List, Optional
 
 from .base import File
 from .utils import ensure_nl
@@ -8,6 +7,11 @@ __all__ = ["GitIgnore"]
 
 
 class GitIgnore(File):
+    __slots__ = ("ignore", "allow")
+
+    # lists the files of its parent
+    detachable = False
+
     def __init__(
         self,
         ignore: Optional[List[str]] = None,
@@ -22,11 +26,12 @@ class GitIgnore(File):
             "\n".join(
                 [
                     *self.ignore,
-                    *(
-                        f"!{'/'.join(Path(path).parts)}"
-                        for path in self.parent.subpaths()
-                    ),
+                    *(f"!{path}" for path in self.parent.subpaths()),
                     *(f"!{path}" for path in self.allow),
                 ]
             )
         )
+
+    def cache_key(self) -> Any:
+        # subpaths() returns a new tuple once anything is added to the parent
+        return (tuple(self.ignore), tuple(self.allow), self.parent.subpaths())
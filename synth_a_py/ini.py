@@ -1,21 +1,64 @@
-from configparser import ConfigParser
-from io import StringIO
-from typing import Any
+from configparser import DEFAULTSECT, ConfigParser
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple, Union
 
 from .base import File
-from .utils import ensure_nl
+from .utils import Lazy, ensure_nl_chunks, fingerprint
 
 __all__ = ["IniFile"]
 
 
+# writes a section as ConfigParser.write does, with keys lower cased as by its
+# default optionxform
+def _write_section(name: str, options: Iterable[Tuple[Any, Any]]) -> str:
+    lines = [f"[{name}]\n"]
+    for key, value in options:
+        if value is None:
+            raise TypeError(f"option values must be strings, [{name}] {key} is None")
+        value = str(value).replace("\n", "\n\t")
+        lines.append(f"{str(key).lower()} = {value}\n")
+    lines.append("\n")
+    return "".join(lines)
+
+
+def _write_sections(obj: Any) -> Iterator[str]:
+    # ConfigParser keeps the options of the defaults section, and of a section
+    # without a name, together and writes them first
+    defaults: Dict[str, Any] = dict()
+    for name, options in obj.items():
+        if str(name) in (DEFAULTSECT, ""):
+            for key, value in options.items():
+                defaults[str(key).lower()] = value
+    if defaults:
+        yield _write_section(DEFAULTSECT, defaults.items())
+
+    for name, options in obj.items():
+        name = str(name)
+        if name != DEFAULTSECT:
+            yield _write_section(name, options.items() if name else ())
+
+
 class IniFile(File):
-    def __init__(self, name: str, obj: Any):
+    __slots__ = ("_obj", "validate")
+
+    obj = Lazy("_obj")
+
+    def __init__(
+        self, name: str, obj: Union[Any, Callable[[], Any]], *, validate: bool = False
+    ):
         super().__init__(name)
         self.obj = obj
+        self.validate = validate
 
     def synth_content(self) -> str:
-        config = ConfigParser()
-        config.read_dict(self.obj)
-        with StringIO() as buf:
-            config.write(buf)
-            return ensure_nl(buf.getvalue())
+        return "".join(self.synth_chunks())
+
+    def synth_chunks(self) -> Iterator[str]:
+        if self.validate:
+            # raises for what ConfigParser can't read back, e.g. duplicate keys
+            # or bad interpolation syntax
+            ConfigParser().read_dict(self.obj)
+
+        return ensure_nl_chunks(_write_sections(self.obj))
+
+    def cache_key(self) -> Any:
+        return fingerprint(self.obj)
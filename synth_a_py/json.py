@@ -0,0 +1,36 @@
+import json
+from typing import Any, Iterator, List
+
+from . import serializers
+from .file import SerializedFile
+
+__all__ = ["JsonFile"]
+
+
+_encoder = json.JSONEncoder(sort_keys=True, indent=2)
+# iterencode yields each token on its own, which are joined into chunks of
+# about this many characters
+_CHUNK_SIZE = 64 * 1024
+
+
+def _dump_chunks(obj: Any) -> Iterator[str]:
+    pieces: List[str] = []
+    size = 0
+    for piece in _encoder.iterencode(obj):
+        pieces.append(piece)
+        size += len(piece)
+        if size >= _CHUNK_SIZE:
+            yield "".join(pieces)
+            pieces.clear()
+            size = 0
+    pieces.append("\n")
+    yield "".join(pieces)
+
+
+serializers.register("json", "json", _dump_chunks, default=True)
+
+
+class JsonFile(SerializedFile):
+    __slots__ = ()
+
+    format = "json"
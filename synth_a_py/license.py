@@ -1,5 +1,5 @@
 from textwrap import dedent
-from typing import Type
+from typing import Any, Type
 
 from typing_extensions import Literal
 
@@ -9,13 +9,20 @@ __all__ = ["License"]
 
 
 class _License(File):
+    __slots__ = ("copyright_period", "copyright_holders")
+
     def __init__(self, copyright_period: str, copyright_holders: str):
         super().__init__("LICENSE")
         self.copyright_period = copyright_period
         self.copyright_holders = copyright_holders
 
+    def cache_key(self) -> Any:
+        return (self.copyright_period, self.copyright_holders)
+
 
 class _ApacheLicense(_License):
+    __slots__ = ()
+
     def __init__(
         self, version: Literal["2.0"], copyright_period: str, copyright_holders: str
     ) -> None:
@@ -228,6 +235,8 @@ class _ApacheLicense(_License):
 
 
 class _MITLicense(_License):
+    __slots__ = ()
+
     def synth_content(self) -> str:
         return dedent(
             f"""\
@@ -0,0 +1,112 @@
+import json
+import os
+from pathlib import Path
+from tempfile import mkstemp
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from .writer import _stat
+
+__all__ = [
+    "MANIFEST_NAME",
+    "Manifest",
+    "ManifestEntry",
+]
+
+MANIFEST_NAME = ".synth-manifest.json"
+
+_VERSION = 1
+
+
+class ManifestEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+class Manifest:
+    def __init__(self, entries: Optional[Dict[str, ManifestEntry]] = None) -> None:
+        self.entries: Dict[str, ManifestEntry] = dict() if entries is None else entries
+
+    @classmethod
+    def load(cls, root: Path) -> "Manifest":
+        # a missing or unreadable manifest is the same as no files synthed yet
+        try:
+            with open(root / MANIFEST_NAME, encoding="utf-8") as f:
+                data = json.load(f)
+            if data["version"] != _VERSION:
+                return cls()
+            return cls(
+                {
+                    relpath: ManifestEntry(**entry)
+                    for relpath, entry in data["files"].items()
+                }
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return cls()
+
+    def save(self, root: Path) -> None:
+        data = {
+            "version": _VERSION,
+            "files": {
+                relpath: entry._asdict() for relpath, entry in self.entries.items()
+            },
+        }
+        fd, name = mkstemp(prefix=f"{MANIFEST_NAME}.", suffix=".tmp", dir=root)
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+                f.write("\n")
+            # mkstemp only lets the owner read the file, which is made readable
+            # like any other file created here
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(name, 0o666 & ~umask)
+            os.replace(name, root / MANIFEST_NAME)
+        except BaseException:
+            os.unlink(name)
+            raise
+
+    def matches(self, relpath: str, path: Path, sha256: Optional[str] = None) -> bool:
+        # whether the file is as synth left it, judged by its stat alone
+        entry = self.entries.get(relpath)
+        if entry is None or (sha256 is not None and entry.sha256 != sha256):
+            return False
+        stat = _stat(path)
+        return (
+            stat is not None
+            and stat.st_size == entry.size
+            and stat.st_mtime_ns == entry.mtime_ns
+        )
+
+    def record(self, relpath: str, path: Path, sha256: str) -> None:
+        stat = path.stat()
+        self.entries[relpath] = ManifestEntry(
+            size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=sha256
+        )
+
+    def prune(self, root: Path, declared: Iterable[str]) -> List[str]:
+        # removes files synthed before but no longer declared, unless they've
+        # been changed since
+        stale = set(self.entries).difference(declared)
+        removed: List[str] = []
+        for relpath in sorted(stale):
+            path = root / relpath
+            if self.matches(relpath, path):
+                if os.name == "nt":
+                    # Windows won't remove read only files
+                    path.chmod(0o644)
+                path.unlink()
+                removed.append(relpath)
+                _remove_empty_parents(root, path)
+            del self.entries[relpath]
+        return removed
+
+
+def _remove_empty_parents(root: Path, path: Path) -> None:
+    for parent in path.parents:
+        if parent == root or root not in parent.parents:
+            break
+        try:
+            parent.rmdir()
+        except OSError:
+            break
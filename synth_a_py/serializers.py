@@ -0,0 +1,68 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+__all__ = [
+    "Serializer",
+    "get",
+    "get_default",
+    "names",
+    "register",
+    "set_default",
+]
+
+# dumps an object, yielding the document in chunks
+Serializer = Callable[[Any], Iterator[str]]
+
+# serializers by format, then by name
+__registry: Dict[str, Dict[str, Serializer]] = dict()
+__defaults: Dict[str, str] = dict()
+
+
+def register(
+    format: str, name: str, serializer: Serializer, *, default: bool = False
+) -> None:
+    __registry.setdefault(format, dict())[name] = serializer
+    if default or format not in __defaults:
+        __defaults[format] = name
+
+
+def names(format: str) -> List[str]:
+    return list(__registry.get(format, ()))
+
+
+def __check(format: str, name: str) -> None:
+    if name not in __registry.get(format, ()):
+        expected = ", ".join(repr(n) for n in names(format))
+        raise ValueError(
+            f"Unknown {format} serializer {name!r}, expected one of: {expected}"
+        )
+
+
+def set_default(format: str, name: str) -> None:
+    __check(format, name)
+    __defaults[format] = name
+
+
+def get_default(format: str) -> str:
+    return __defaults[format]
+
+
+def get(format: str, name: Optional[str] = None) -> Serializer:
+    if name is None:
+        name = __defaults[format]
+    __check(format, name)
+    return __registry[format][name]
+
+
+_Snapshot = Tuple[Dict[str, Dict[str, Serializer]], Dict[str, str]]
+
+
+def _snapshot() -> _Snapshot:
+    return {f: dict(by_name) for f, by_name in __registry.items()}, dict(__defaults)
+
+
+def _restore(snapshot: _Snapshot) -> None:
+    registry, defaults = snapshot
+    __registry.clear()
+    __registry.update({f: dict(by_name) for f, by_name in registry.items()})
+    __defaults.clear()
+    __defaults.update(defaults)
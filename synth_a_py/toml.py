@@ -1,16 +1,145 @@
-from typing import Any
+import math
+import re
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterator, List, Match
 
 import toml
 
-from .base import File
+from . import serializers
+from .file import SerializedFile
 
 __all__ = ["TomlFile"]
 
 
-class TomlFile(File):
-    def __init__(self, name: str, obj: Any):
-        super().__init__(name)
-        self.obj = obj
+# toml.dumps, yielding each table as it's dumped
+def _dump_chunks(obj: Any) -> Iterator[str]:
+    encoder = toml.TomlEncoder(obj.__class__)
+    chunk, sections = encoder.dump_sections(obj, "")
+    yield chunk
 
-    def synth_content(self) -> str:
-        return toml.dumps(self.obj)
+    # the last two characters dumped, and whether anything has been
+    tail = chunk[-2:]
+    dumped = bool(chunk)
+
+    outer_objs: List[int] = [id(obj)]
+    while sections:
+        section_ids = [id(section) for section in sections.values()]
+        for outer_obj in outer_objs:
+            if outer_obj in section_ids:
+                raise ValueError("Circular reference detected")
+        outer_objs += section_ids
+        new_sections = encoder.get_empty_table()
+        for section in sections:
+            chunk, subsections = encoder.dump_sections(sections[section], section)
+
+            if chunk or not subsections:
+                separator = "\n" if dumped and tail != "\n\n" else ""
+                chunk = f"{separator}[{section}]\n{chunk}"
+                yield chunk
+                tail = (tail + chunk)[-2:]
+                dumped = True
+            for s in subsections:
+                new_sections[section + "." + s] = subsections[s]
+        sections = new_sections
+
+
+_BARE_KEY = re.compile(r"[A-Za-z0-9_-]+\Z")
+_ESCAPE = re.compile(r'["\\\x00-\x1f\x7f]')
+_ESCAPES = {
+    '"': '\\"',
+    "\\": "\\\\",
+    "\b": "\\b",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\f": "\\f",
+    "\r": "\\r",
+}
+
+
+def _escape(match: Match[str]) -> str:
+    char = match.group()
+    return _ESCAPES.get(char) or f"\\u{ord(char):04x}"
+
+
+def _string(value: str) -> str:
+    return f'"{_ESCAPE.sub(_escape, value)}"'
+
+
+def _key(key: Any) -> str:
+    key = str(key)
+    return key if _BARE_KEY.match(key) else _string(key)
+
+
+def _value(value: Any) -> str:
+    if isinstance(value, str):
+        return _string(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(int(value))
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "nan"
+        if math.isinf(value):
+            return "inf" if value > 0 else "-inf"
+        return repr(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return f"[{', '.join(_value(v) for v in value if v is not None)}]"
+    if isinstance(value, dict):
+        if not value:
+            return "{}"
+        pairs = (f"{_key(k)} = {_value(v)}" for k, v in value.items() if v is not None)
+        return f"{{ {', '.join(pairs)} }}"
+    raise TypeError(f"Object of type {type(value).__name__} is not TOML serializable")
+
+
+def _is_table_array(value: Any) -> bool:
+    return (
+        isinstance(value, (list, tuple))
+        and bool(value)
+        and all(isinstance(v, dict) for v in value)
+    )
+
+
+# yields each table as a whole, depth first: the header (if any) and its pairs
+def _tables(table: Dict[Any, Any], path: str, header: str) -> Iterator[str]:
+    lines: List[str] = []
+    subtables = []
+    for key, value in table.items():
+        if value is None:
+            continue
+        if isinstance(value, dict) or _is_table_array(value):
+            subtables.append((key, value))
+        else:
+            lines.append(f"{_key(key)} = {_value(value)}\n")
+
+    # like toml, a table holding only tables is implied by its subtables
+    if lines or (header and (header.startswith("[[") or not subtables)):
+        yield header + "".join(lines)
+
+    for key, value in subtables:
+        subpath = f"{path}.{_key(key)}" if path else _key(key)
+        if isinstance(value, dict):
+            yield from _tables(value, subpath, f"[{subpath}]\n")
+        else:
+            for item in value:
+                yield from _tables(item, subpath, f"[[{subpath}]]\n")
+
+
+# a compact, deterministic emitter: keys keep their order, tables are written
+# depth first and arrays inline
+def _emit_chunks(obj: Any) -> Iterator[str]:
+    for i, chunk in enumerate(_tables(obj, "", "")):
+        yield f"\n{chunk}" if i else chunk
+
+
+serializers.register("toml", "toml", _dump_chunks, default=True)
+serializers.register("toml", "fast", _emit_chunks)
+
+
+class TomlFile(SerializedFile):
+    __slots__ = ()
+
+    format = "toml"
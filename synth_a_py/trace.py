@@ -0,0 +1,49 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .base import RenderEvent, SynthObserver, WriteEvent
+
+__all__ = ["ChromeTrace"]
+
+
+def _microseconds(seconds: float) -> float:
+    return round(seconds * 1_000_000, 3)
+
+
+class ChromeTrace(SynthObserver):
+    # collects trace events for chrome://tracing or https://ui.perfetto.dev
+    def __init__(self) -> None:
+        self.events: List[Dict[str, Any]] = []
+
+    def rendered(self, event: RenderEvent) -> None:
+        self.events.append(
+            {
+                "name": str(event.path),
+                "cat": "render",
+                "ph": "X",
+                "ts": _microseconds(event.start),
+                "dur": _microseconds(event.end - event.start),
+                "pid": event.pid,
+                "tid": event.thread,
+                "args": {"type": event.file_type, "bytes": event.size},
+            }
+        )
+
+    def written(self, event: WriteEvent) -> None:
+        self.events.append(
+            {
+                "name": str(event.path),
+                "cat": "write",
+                "ph": "X",
+                "ts": _microseconds(event.start),
+                "dur": _microseconds(event.end - event.start),
+                "pid": event.pid,
+                "tid": event.thread,
+                "args": {"outcome": event.outcome},
+            }
+        )
+
+    def save(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
@@ -1,10 +1,14 @@
 __all__ = [
+    "Lazy",
     "ensure_nl",
+    "ensure_nl_chunks",
+    "fingerprint",
     "init_mix_ins",
 ]
 
+from functools import lru_cache
 from inspect import Parameter, Signature, signature
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
 
 from typing_extensions import Final
 
@@ -13,15 +17,57 @@ def ensure_nl(s: str) -> str:
     return s.rstrip() + "\n"
 
 
+def ensure_nl_chunks(chunks: Iterable[str]) -> Iterator[str]:
+    # same as ensure_nl on the joined chunks, trailing whitespace is held back
+    # until it's known whether anything follows it
+    whitespace = ""
+    for chunk in chunks:
+        content = chunk.rstrip()
+        if content:
+            yield whitespace + content
+            whitespace = chunk[len(content) :]
+        else:
+            whitespace += chunk
+    yield "\n"
+
+
+class Lazy:
+    # an attribute which may be set to a zero-arg callable, that's called for
+    # the value when the attribute is first read, which is kept in the slot
+    def __init__(self, slot: str) -> None:
+        self.slot = slot
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> Any:
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot)
+        if callable(value):
+            value = value()
+            setattr(instance, self.slot, value)
+        return value
+
+    def __set__(self, instance: Any, value: Any) -> None:
+        setattr(instance, self.slot, value)
+
+
+def fingerprint(obj: Any) -> str:
+    # the repr of plain data (dicts, lists, strings, numbers, ...) changes
+    # whenever anything nested within it is changed
+    return repr(obj)
+
+
 no_param_init: Final[Signature] = Signature(
     (Parameter("self", Parameter.POSITIONAL_OR_KEYWORD),),
     return_annotation=None,
 )
 
 
+@lru_cache(maxsize=None)
+def _no_param_inits(t: type) -> Tuple[Callable[[Any], None], ...]:
+    inits = (getattr(base, "__init__") for base in t.__bases__)
+    return tuple(init for init in inits if signature(init) == no_param_init)
+
+
 def init_mix_ins(self: Any, t: type) -> None:
-    bases = t.__bases__
-    for base in bases:
-        init = getattr(base, "__init__")
-        if signature(init) == no_param_init:
-            init(self)
+    for init in _no_param_inits(t):
+        init(self)
@@ -0,0 +1,654 @@
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import partial
+from itertools import chain
+from pathlib import Path
+from stat import S_IMODE, S_ISREG
+from tempfile import mkstemp
+from threading import Lock
+from typing import (
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from uuid import uuid4
+
+from typing_extensions import Literal
+
+__all__ = [
+    "DirFdWriter",
+    "Durability",
+    "Writer",
+    "WriterBackend",
+    "compare",
+    "open_writer",
+]
+
+Durability = Literal["none", "file", "batch"]
+WriterBackend = Literal["path", "dirfd"]
+
+_BUFFER_SIZE = 1 << 16
+
+_T = TypeVar("_T")
+
+
+def _stat(path: Path) -> Optional[os.stat_result]:
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
+
+
+def _same_content(path: Path, stat: os.stat_result, data: bytes) -> bool:
+    # compare sizes first so changed files are rarely read back
+    if not S_ISREG(stat.st_mode) or stat.st_size != len(data):
+        return False
+    return path.read_bytes() == data
+
+
+def _read(path: Path, size: Optional[int] = None) -> Iterator[bytes]:
+    with open(path, "rb", buffering=0) as f:
+        yield from _read_from(f, size)
+
+
+def _read_from(f: BinaryIO, size: Optional[int] = None) -> Iterator[bytes]:
+    while size is None or size > 0:
+        block = f.read(_BUFFER_SIZE if size is None else min(size, _BUFFER_SIZE))
+        if not block:
+            break
+        if size is not None:
+            size -= len(block)
+        yield block
+
+
+def _fsync(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def compare(path: Path, data: bytes) -> Optional[bool]:
+    stat = _stat(path)
+    if stat is None:
+        return None
+    return _same_content(path, stat, data)
+
+
+class Writer:
+    def __init__(
+        self,
+        *,
+        incremental: bool = False,
+        atomic: bool = False,
+        durability: Durability = "none",
+    ) -> None:
+        self.incremental = incremental
+        self.atomic = atomic
+        # read only files can't be synced on Windows, so they're synced before
+        # being closed
+        if durability == "batch" and os.name == "nt":
+            durability = "file"
+        self.durability = durability
+        self.__unsynced: List[Path] = []
+        self.__directories: Set[Path] = set()
+        # temporary files by the path they replace, which with batch durability
+        # are only renamed once all their content is synced
+        self.__renames: Dict[Path, Path] = dict()
+
+    def __enter__(self) -> "Writer":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def makedirs(self, path: Path) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+
+    def write(self, path: Path, content: Union[str, Iterator[str]]) -> bool:
+        if isinstance(content, str):
+            data = content.encode("utf-8")
+            if self.incremental and self.__is_unchanged(path, data):
+                return False
+            self.__store(path, 0, (data,))
+            return True
+
+        offset = 0
+        rest: Iterator[bytes] = (chunk.encode("utf-8") for chunk in content)
+        if self.incremental:
+            compared = self.__compare_chunks(path, rest)
+            if compared is None:
+                return False
+            offset, rest = compared
+
+        self.__store(path, offset, rest)
+        return True
+
+    def link(self, source: Path, path: Path, size: int) -> Tuple[bool, int]:
+        source = self.__renames.get(source, source)
+        if self.incremental:
+            try:
+                if os.path.samefile(source, path):
+                    return False, size
+            except FileNotFoundError:
+                pass
+
+        try:
+            if self.atomic:
+                temp = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+                os.link(source, temp)
+                self.__replace_with(temp, path)
+            else:
+                if _stat(path) is not None:
+                    self.__remove(path)
+                os.link(source, path)
+        except OSError:
+            # across devices, or where hard links aren't supported
+            self.__store(path, 0, _read(source))
+            return True, 0
+
+        if self.durability != "none":
+            self.__directories.add(path.parent)
+        return True, size
+
+    def close(self) -> None:
+        renames, self.__renames = self.__renames, dict()
+        try:
+            for path in self.__unsynced:
+                _fsync(renames.get(path, path))
+            self.__unsynced.clear()
+            while renames:
+                path, temp = next(iter(renames.items()))
+                os.replace(temp, path)
+                del renames[path]
+        finally:
+            # if anything failed, the files not yet renamed are left as they were
+            self.__unsynced.clear()
+            for temp in renames.values():
+                temp.unlink()
+
+        if os.name != "nt":
+            for directory in sorted(self.__directories):
+                _fsync(directory)
+        self.__directories.clear()
+
+    def __is_unchanged(self, path: Path, data: bytes) -> bool:
+        stat = _stat(path)
+        if stat is None or not _same_content(path, stat, data):
+            return False
+
+        if S_IMODE(stat.st_mode) != 0o444:
+            path.chmod(0o444)
+        return True
+
+    def __compare_chunks(
+        self, path: Path, encoded: Iterator[bytes]
+    ) -> Optional[Tuple[int, Iterator[bytes]]]:
+        # returns how much of the file already holds the rendered content, and
+        # the content that follows, or None if the file is unchanged
+        try:
+            existing = open(path, "rb", buffering=_BUFFER_SIZE)
+        except FileNotFoundError:
+            return 0, encoded
+
+        offset = 0
+        with existing:
+            for data in encoded:
+                if existing.read(len(data)) != data:
+                    return offset, chain((data,), encoded)
+                offset += len(data)
+
+            if existing.read(1):
+                return offset, iter(())
+
+            if S_IMODE(os.fstat(existing.fileno()).st_mode) != 0o444:
+                path.chmod(0o444)
+            return None
+
+    def __store(self, path: Path, offset: int, rest: Iterable[bytes]) -> None:
+        # writes rest after the first offset bytes of the existing file
+        stat = _stat(path)
+        if self.atomic or (stat is not None and stat.st_nlink > 1):
+            # files linked to others are replaced so the others are unchanged
+            prefix = _read(path, offset) if offset else iter(())
+            self.__replace(path, chain(prefix, rest))
+            return
+
+        # ensure writable
+        if stat is not None and S_ISREG(stat.st_mode):
+            path.chmod(0o644)
+
+        # write and mark read only
+        with open(path, "r+b" if offset else "wb", buffering=_BUFFER_SIZE) as f:
+            f.seek(offset)
+            for data in rest:
+                f.write(data)
+            f.truncate()
+            self.__sync(f, path)
+        path.chmod(0o444)
+
+    def __replace(self, path: Path, content: Iterable[bytes]) -> None:
+        fd, name = mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        temp = Path(name)
+        try:
+            with open(fd, "wb", buffering=_BUFFER_SIZE) as f:
+                for data in content:
+                    f.write(data)
+                self.__sync(f, path)
+            temp.chmod(0o444)
+        except BaseException:
+            temp.unlink()
+            raise
+        self.__replace_with(temp, path)
+
+    def __replace_with(self, temp: Path, path: Path) -> None:
+        if self.durability == "batch":
+            self.__renames[path] = temp
+            return
+        try:
+            # Windows won't replace read only files
+            if os.name == "nt" and _stat(path) is not None:
+                path.chmod(0o644)
+            os.replace(temp, path)
+        except BaseException:
+            if os.name == "nt":
+                temp.chmod(0o644)
+            temp.unlink()
+            raise
+
+    def __remove(self, path: Path) -> None:
+        # Windows won't remove read only files
+        if os.name == "nt":
+            path.chmod(0o644)
+        path.unlink()
+
+    def __sync(self, f: BinaryIO, path: Path) -> None:
+        if self.durability == "file":
+            f.flush()
+            os.fsync(f.fileno())
+        elif self.durability == "batch":
+            self.__unsynced.append(path)
+        if self.durability != "none":
+            self.__directories.add(path.parent)
+
+
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_CLOEXEC", 0)
+_CREATE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_CLOEXEC", 0)
+# open directories are closed once more than this many are open
+_MAX_OPEN_DIRECTORIES = 64
+
+
+def _write_all(fd: int, content: Iterable[bytes]) -> None:
+    # coalesce small chunks so each write call moves a full buffer
+    buffer = bytearray()
+    for data in content:
+        buffer += data
+        if len(buffer) >= _BUFFER_SIZE:
+            _write_fully(fd, buffer)
+            buffer.clear()
+    _write_fully(fd, buffer)
+
+
+def _write_fully(fd: int, data: bytearray) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+class _Directory:
+    __slots__ = ("fd", "names", "users")
+
+    def __init__(self, fd: int, names: Set[str]) -> None:
+        self.fd: Optional[int] = fd
+        # listed once when the directory is first opened
+        self.names = names
+        self.users = 0
+
+
+class DirFdWriter:
+    # opens each directory once, and works on files relative to it
+    supported = {
+        os.open,
+        os.mkdir,
+        os.unlink,
+        os.link,
+        os.rename,
+        os.stat,
+    } <= os.supports_dir_fd and os.scandir in os.supports_fd
+
+    def __init__(
+        self,
+        *,
+        incremental: bool = False,
+        atomic: bool = False,
+        durability: Durability = "none",
+    ) -> None:
+        self.incremental = incremental
+        self.atomic = atomic
+        self.durability = durability
+        # files are created read only, which only needs fixing up if the umask
+        # strips some of the read bits
+        umask = os.umask(0)
+        os.umask(umask)
+        self.__fchmod = bool(umask & 0o444)
+        self.__lock = Lock()
+        self.__directories: Dict[Path, _Directory] = dict()
+        # directories with an open fd, least recently used first
+        self.__open: "OrderedDict[Path, _Directory]" = OrderedDict()
+        self.__unsynced: List[Path] = []
+        self.__touched: Set[Path] = set()
+        # as for Writer, temporary file names by the path they replace
+        self.__renames: Dict[Path, str] = dict()
+
+    def __enter__(self) -> "DirFdWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def makedirs(self, path: Path) -> None:
+        if path in self.__directories:
+            return
+
+        if path.parent not in self.__directories:
+            try:
+                fd = os.open(path, _DIR_FLAGS)
+            except FileNotFoundError:
+                self.makedirs(path.parent)
+            else:
+                self.__add(path, fd, _list(fd))
+                return
+
+        # made relative to the parent, whose listing says if it exists already
+        parent_names = self.__directories[path.parent].names
+        with self.__use(path.parent) as parent:
+            names: Optional[Set[str]] = None
+            if path.name not in parent_names:
+                try:
+                    os.mkdir(path.name, dir_fd=parent)
+                    names = set()
+                except FileExistsError:
+                    pass
+            fd = os.open(path.name, _DIR_FLAGS, dir_fd=parent)
+        parent_names.add(path.name)
+        self.__add(path, fd, _list(fd) if names is None else names)
+
+    def write(self, path: Path, content: Union[str, Iterator[str]]) -> bool:
+        self.makedirs(path.parent)
+        with self.__use(path.parent) as directory:
+            exists = self.__exists(path)
+
+            if isinstance(content, str):
+                data = content.encode("utf-8")
+                if (
+                    self.incremental
+                    and exists
+                    and self.__is_unchanged(directory, path.name, data)
+                ):
+                    return False
+                self.__store(directory, path, exists, (data,))
+                return True
+
+            encoded = (chunk.encode("utf-8") for chunk in content)
+            if not self.incremental or not exists:
+                self.__store(directory, path, exists, encoded)
+                return True
+
+            fd = os.open(path.name, os.O_RDONLY, dir_fd=directory)
+            with open(fd, "rb", buffering=_BUFFER_SIZE) as existing:
+                offset = 0
+                for data in encoded:
+                    if existing.read(len(data)) != data:
+                        rest: Iterator[bytes] = chain((data,), encoded)
+                        break
+                    offset += len(data)
+                else:
+                    if not existing.read(1):
+                        _ensure_read_only(existing.fileno())
+                        return False
+                    rest = iter(())
+
+                # the old file stays readable while it's replaced
+                existing.seek(0)
+                prefix = _read_from(existing, offset)
+                self.__store(directory, path, True, chain(prefix, rest))
+            return True
+
+    def link(self, source: Path, path: Path, size: int) -> Tuple[bool, int]:
+        self.makedirs(path.parent)
+        source_name = self.__renames.get(source, source.name)
+        with self.__use(source.parent) as source_directory, self.__use(
+            path.parent
+        ) as directory:
+            exists = self.__exists(path)
+
+            if self.incremental and exists:
+                stat = os.stat(path.name, dir_fd=directory)
+                linked = os.stat(source_name, dir_fd=source_directory)
+                if (stat.st_dev, stat.st_ino) == (linked.st_dev, linked.st_ino):
+                    return False, size
+
+            try:
+                if self.atomic:
+                    temp = f".{path.name}.{uuid4().hex}.tmp"
+                    os.link(
+                        source_name,
+                        temp,
+                        src_dir_fd=source_directory,
+                        dst_dir_fd=directory,
+                    )
+                    self.__rename(directory, temp, path)
+                else:
+                    if exists:
+                        _unlink(directory, path.name)
+                    _replacing(
+                        directory,
+                        path.name,
+                        partial(
+                            os.link,
+                            source_name,
+                            path.name,
+                            src_dir_fd=source_directory,
+                            dst_dir_fd=directory,
+                        ),
+                    )
+            except OSError:
+                # across devices, or where hard links aren't supported
+                fd = os.open(source_name, os.O_RDONLY, dir_fd=source_directory)
+                with open(fd, "rb", buffering=0) as f:
+                    self.__store(directory, path, exists, _read_from(f))
+                return True, 0
+
+        self.__directories[path.parent].names.add(path.name)
+        if self.durability != "none":
+            self.__touched.add(path.parent)
+        return True, size
+
+    def close(self) -> None:
+        renames, self.__renames = self.__renames, dict()
+        try:
+            try:
+                for path in self.__unsynced:
+                    name = renames.get(path, path.name)
+                    with self.__use(path.parent) as directory:
+                        fd = os.open(name, os.O_RDONLY, dir_fd=directory)
+                        try:
+                            os.fsync(fd)
+                        finally:
+                            os.close(fd)
+                while renames:
+                    path, temp = next(iter(renames.items()))
+                    with self.__use(path.parent) as directory:
+                        os.replace(
+                            temp, path.name, src_dir_fd=directory, dst_dir_fd=directory
+                        )
+                    del renames[path]
+            finally:
+                # if anything failed, the files not yet renamed are left as they were
+                for path, temp in renames.items():
+                    with self.__use(path.parent) as directory:
+                        _unlink(directory, temp)
+            for parent in sorted(self.__touched):
+                with self.__use(parent) as directory:
+                    os.fsync(directory)
+        finally:
+            self.__unsynced.clear()
+            self.__touched.clear()
+            for opened in self.__open.values():
+                if opened.fd is not None:
+                    os.close(opened.fd)
+            self.__open.clear()
+            self.__directories.clear()
+
+    def __add(self, path: Path, fd: int, names: Set[str]) -> None:
+        with self.__lock:
+            directory = _Directory(fd, names)
+            self.__directories[path] = directory
+            self.__open[path] = directory
+            self.__evict()
+
+    @contextmanager
+    def __use(self, path: Path) -> Iterator[int]:
+        with self.__lock:
+            directory = self.__directories[path]
+            if directory.fd is None:
+                directory.fd = os.open(path, _DIR_FLAGS)
+            self.__open[path] = directory
+            self.__open.move_to_end(path)
+            directory.users += 1
+            fd = directory.fd
+            self.__evict()
+        try:
+            yield fd
+        finally:
+            with self.__lock:
+                directory.users -= 1
+
+    def __evict(self) -> None:
+        # called holding the lock, closes directories no longer in use
+        for path in list(self.__open):
+            if len(self.__open) <= _MAX_OPEN_DIRECTORIES:
+                break
+            directory = self.__open[path]
+            if directory.users == 0 and directory.fd is not None:
+                os.close(directory.fd)
+                directory.fd = None
+                del self.__open[path]
+
+    def __exists(self, path: Path) -> bool:
+        return path.name in self.__directories[path.parent].names
+
+    def __is_unchanged(self, directory: int, name: str, data: bytes) -> bool:
+        stat = os.stat(name, dir_fd=directory)
+        if not S_ISREG(stat.st_mode) or stat.st_size != len(data):
+            return False
+
+        fd = os.open(name, os.O_RDONLY, dir_fd=directory)
+        with open(fd, "rb", buffering=0) as f:
+            if f.readall() != data:
+                return False
+            if S_IMODE(stat.st_mode) != 0o444:
+                os.fchmod(fd, 0o444)
+        return True
+
+    def __store(
+        self, directory: int, path: Path, exists: bool, content: Iterable[bytes]
+    ) -> None:
+        if self.atomic:
+            temp = f".{path.name}.{uuid4().hex}.tmp"
+            try:
+                self.__create(directory, temp, content)
+            except BaseException:
+                os.unlink(temp, dir_fd=directory)
+                raise
+            self.__rename(directory, temp, path)
+        else:
+            # existing files are replaced rather than truncated, so they needn't
+            # be made writable first and any files linked to them are unchanged
+            if exists:
+                _unlink(directory, path.name)
+            self.__create(directory, path.name, content)
+        self.__directories[path.parent].names.add(path.name)
+
+        if self.durability == "batch":
+            self.__unsynced.append(path)
+        if self.durability != "none":
+            self.__touched.add(path.parent)
+
+    def __rename(self, directory: int, temp: str, path: Path) -> None:
+        if self.durability == "batch":
+            self.__renames[path] = temp
+        else:
+            _rename(directory, temp, path.name)
+
+    def __create(self, directory: int, name: str, content: Iterable[bytes]) -> None:
+        fd = _replacing(
+            directory,
+            name,
+            partial(os.open, name, _CREATE_FLAGS, 0o444, dir_fd=directory),
+        )
+        try:
+            if self.__fchmod:
+                os.fchmod(fd, 0o444)
+            _write_all(fd, content)
+            if self.durability == "file":
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _list(fd: int) -> Set[str]:
+    return {entry.name for entry in os.scandir(fd)}
+
+
+def _ensure_read_only(fd: int) -> None:
+    if S_IMODE(os.fstat(fd).st_mode) != 0o444:
+        os.fchmod(fd, 0o444)
+
+
+def _replacing(directory: int, name: str, create: Callable[[], _T]) -> _T:
+    try:
+        return create()
+    except FileExistsError:
+        # created since the directory was listed
+        _unlink(directory, name)
+        return create()
+
+
+def _rename(directory: int, temp: str, name: str) -> None:
+    try:
+        os.replace(temp, name, src_dir_fd=directory, dst_dir_fd=directory)
+    except BaseException:
+        os.unlink(temp, dir_fd=directory)
+        raise
+
+
+def _unlink(directory: int, name: str) -> None:
+    try:
+        os.unlink(name, dir_fd=directory)
+    except FileNotFoundError:
+        pass
+
+
+def open_writer(
+    backend: WriterBackend = "path",
+    *,
+    incremental: bool = False,
+    atomic: bool = False,
+    durability: Durability = "none",
+) -> Union[Writer, DirFdWriter]:
+    # dirfd falls back to paths where the OS can't work relative to directories
+    writer_type = (
+        DirFdWriter if backend == "dirfd" and DirFdWriter.supported else Writer
+    )
+    return writer_type(incremental=incremental, atomic=atomic, durability=durability)
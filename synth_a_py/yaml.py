@@ -1,32 +1,288 @@
-from copy import deepcopy
-from typing import Any
+import re
+from collections.abc import MutableMapping, MutableSequence
+from copy import copy
+from functools import lru_cache
+from threading import local
+from typing import Any, Dict, Iterator, List, Optional, Set
 
+from ruamel.yaml.comments import CommentedBase
 from ruamel.yaml.compat import StringIO
 from ruamel.yaml.main import YAML
-from ruamel.yaml.scalarstring import walk_tree as insert_multiline_literals_inplace
+from ruamel.yaml.nodes import ScalarNode
+from ruamel.yaml.scalarstring import preserve_literal
 
-from .base import File
+from . import serializers
+from .file import SerializedFile
 
 __all__ = ["YamlFile"]
 
 
-class _YAML(YAML):
+# a YAML instance keeps the state of the document it's dumping, so each thread
+# dumps with its own
+class _YAML(local):
+    def __init__(self) -> None:
+        self.__yaml = YAML()
+        self.__yaml.indent(mapping=2, sequence=4, offset=2)
+
     def dumps(self, data: Any) -> str:
         stream = StringIO()
-        self.dump(data, stream)
+        self.__yaml.dump(data, stream)
         return stream.getvalue()
 
 
 yaml = _YAML()
-yaml.indent(mapping=2, sequence=4, offset=2)
 
 
-class YamlFile(File):
-    def __init__(self, name: str, obj: Any):
-        super().__init__(name)
-        self.obj = obj
+# like ruamel.yaml.scalarstring.walk_tree, but instead of mutating obj only the
+# containers leading to multiline strings are copied and the rest is shared
+def _copy(obj: Any) -> Any:
+    if not isinstance(obj, CommentedBase):
+        return copy(obj)
+    # the comments, anchors and flow style of round-trip data are kept, which
+    # copy() would share with obj and then move as it adds the items back
+    converted: Any = type(obj)()
+    if isinstance(obj, MutableMapping):
+        converted.update(obj)
+    else:
+        converted.extend(obj)
+    obj.copy_attributes(converted, memo=dict())
+    return converted
+
+
+class _MultilineLiterals:
+    def __init__(self) -> None:
+        self.__converted: Dict[int, Any] = dict()
+        # whether any container was reached more than once, which ruamel dumps
+        # as an anchor and aliases
+        self.shared = False
+
+    def convert(self, obj: Any) -> Any:
+        if isinstance(obj, str):
+            return preserve_literal(obj) if "\n" in obj else obj
+        if not isinstance(obj, (MutableMapping, MutableSequence)):
+            return obj
+
+        # converted the same way wherever it appears so anchors are kept
+        if id(obj) in self.__converted:
+            self.shared = True
+            return self.__converted[id(obj)]
+
+        converted = obj
+        items = obj.items() if isinstance(obj, MutableMapping) else enumerate(obj)
+        for key, value in items:
+            new_value = self.convert(value)
+            if new_value is not value:
+                if converted is obj:
+                    converted = _copy(obj)
+                converted[key] = new_value
+
+        self.__converted[id(obj)] = converted
+        return converted
+
+
+def _dump_chunks(obj: Any) -> Iterator[str]:
+    # top level mappings and sequences are dumped an entry at a time, which
+    # gives the same output unless there are anchors to number
+    parts: List[Any] = []
+    if type(obj) is dict:
+        parts = [{key: value} for key, value in obj.items()]
+    elif type(obj) is list:
+        parts = [[item] for item in obj]
+
+    literals = _MultilineLiterals()
+    converted = [literals.convert(part) for part in parts]
+    if len(parts) > 1 and not literals.shared:
+        for i, part in enumerate(converted, 1):
+            chunk = yaml.dumps(part)
+            # a part ending in a |+ literal is ended with a document end marker,
+            # which only belongs at the end of the whole document
+            if i < len(converted) and chunk.endswith("\n...\n"):
+                chunk = chunk[: -len("...\n")]
+            yield chunk
+    elif isinstance(obj, str):
+        # like walk_tree, only strings within containers are made literals
+        yield yaml.dumps(obj)
+    else:
+        yield yaml.dumps(_MultilineLiterals().convert(obj))
+
+
+# raised by the fast emitter for anything it can't dump exactly as ruamel does
+class _Unsupported(Exception):
+    pass
+
+
+_WIDTH = 80
+_STR_TAG = "tag:yaml.org,2002:str"
+# printable by ruamel without escapes, and safe between double quotes
+_DOUBLE_QUOTABLE = re.compile(
+    r"[\x20-\x21\x23-\x5b\x5d-\x7e"
+    r"\xa0-\u2027\u202a-\ud7ff\ue000-\ufefe\uff00-\ufffd]*\Z"
+)
+# lines ruamel writes as they are in a literal block
+_LITERAL_LINE = re.compile(
+    r"(?:[\x20-\x7e\xa0-\u2027\u202a-\ud7ff\ue000-\ufefe\uff00-\ufffd]*"
+    r"[\x21-\x7e\xa1-\u2027\u202a-\ud7ff\ue000-\ufefe\uff00-\ufffd])?\Z"
+)
+
+# never dumps, so its emitter and resolver can be shared between threads
+_analyzer = YAML()
+# the resolver builds its tables on first use, which is done here so threads
+# don't race to build them
+_analyzer.resolver.resolve(ScalarNode, "", (True, False))
+
+
+# the style ruamel picks for a str on one line: plain, or single or double quoted
+@lru_cache(maxsize=4096)
+def _style(value: str) -> Optional[str]:
+    analysis = _analyzer.emitter.analyze_scalar(value)
+    if analysis.multiline:
+        return None
+    tag = _analyzer.resolver.resolve(ScalarNode, value, (True, False))
+    if analysis.allow_block_plain and str(tag) == _STR_TAG:
+        return ""
+    if analysis.allow_double_quoted and "'" in value:
+        return '"'
+    if analysis.allow_single_quoted:
+        return "'"
+    return '"'
+
+
+def _scalar(value: Any) -> str:
+    if type(value) is str:
+        style = _style(value)
+        if style == "":
+            return value
+        if style == "'":
+            return f"'{value}'"
+        if style == '"' and _DOUBLE_QUOTABLE.match(value):
+            return f'"{value}"'
+    elif type(value) is bool:
+        return "true" if value else "false"
+    elif type(value) is int:
+        return str(value)
+    elif type(value) is float:
+        # how ruamel writes exponents and infinities varies between versions
+        text = repr(value)
+        if text.lstrip("-").replace(".", "", 1).isdigit():
+            return text
+    raise _Unsupported()
+
+
+class _Emitter:
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        # whether the last line written ends a |+ literal, after which ruamel
+        # ends the document with a marker
+        self.open_ended = False
+        self.__seen: Set[int] = set()
+
+    def __container(self, value: Any) -> None:
+        # ruamel dumps containers that appear more than once as anchors
+        if id(value) in self.__seen:
+            raise _Unsupported()
+        self.__seen.add(id(value))
+
+    def __line(self, line: str) -> None:
+        # ruamel folds lines longer than this, in ways that vary by version
+        if len(line) > _WIDTH:
+            raise _Unsupported()
+        self.lines.append(line)
+        self.open_ended = False
+
+    def __literal(self, line: str, value: str, indent: int) -> None:
+        if value[0] in " \n" or not value.strip("\n"):
+            raise _Unsupported()
+        body = value.split("\n")
+        if value.endswith("\n\n"):
+            chomp = "+"
+        elif value.endswith("\n"):
+            chomp = ""
+        else:
+            chomp = "-"
+        if value.endswith("\n"):
+            body.pop()
+        self.lines.append(f"{line}|{chomp}")
+        for text in body:
+            if not _LITERAL_LINE.match(text):
+                raise _Unsupported()
+            self.lines.append(f"{' ' * indent}{text}" if text else "")
+        self.open_ended = chomp == "+"
+
+    # writes value after line, whose nested lines are indented by indent
+    def __value(self, line: str, value: Any, indent: int) -> None:
+        if value is None:
+            self.__line(line.rstrip(" "))
+        elif type(value) is str and "\n" in value:
+            self.__literal(line, value, indent)
+        elif type(value) is dict and value:
+            self.__container(value)
+            self.__line(line.rstrip(" "))
+            self.mapping(value, indent, " " * indent)
+        elif type(value) is list and value:
+            self.__container(value)
+            self.__line(line.rstrip(" "))
+            self.sequence(value, indent, " " * indent)
+        elif type(value) is dict:
+            self.__line(f"{line}{{}}")
+        elif type(value) is list:
+            self.__line(f"{line}[]")
+        else:
+            self.__line(f"{line}{_scalar(value)}")
+
+    def mapping(self, mapping: Dict[Any, Any], indent: int, line: str) -> None:
+        for key, value in mapping.items():
+            if type(key) is not str or not key or "\n" in key:
+                raise _Unsupported()
+            self.__value(f"{line}{_scalar(key)}: ", value, indent + 2)
+            line = " " * indent
+
+    def sequence(self, sequence: List[Any], indent: int, line: str) -> None:
+        for item in sequence:
+            if item is None:
+                raise _Unsupported()
+            if type(item) is dict and item:
+                self.__container(item)
+                self.mapping(item, indent + 2, f"{line}- ")
+            elif type(item) is list and item:
+                self.__container(item)
+                self.sequence(item, indent + 4, f"{line}-   ")
+            else:
+                self.__value(f"{line}- ", item, indent + 2)
+            line = " " * indent
+
+
+def _emit(obj: Any) -> Optional[str]:
+    emitter = _Emitter()
+    try:
+        if type(obj) is dict and obj:
+            emitter.mapping(obj, 0, "")
+        elif type(obj) is list and obj:
+            emitter.sequence(obj, 2, "  ")
+        else:
+            return None
+    except _Unsupported:
+        return None
+    if emitter.open_ended:
+        emitter.lines.append("...")
+    emitter.lines.append("")
+    return "\n".join(emitter.lines)
+
+
+# writes plain dicts, lists and scalars directly, giving the same output as
+# ruamel, which anything else is left to
+def _emit_chunks(obj: Any) -> Iterator[str]:
+    content = _emit(obj)
+    if content is None:
+        yield from _dump_chunks(obj)
+    else:
+        yield content
+
+
+serializers.register("yaml", "ruamel", _dump_chunks, default=True)
+serializers.register("yaml", "fast", _emit_chunks)
+
+
+class YamlFile(SerializedFile):
+    __slots__ = ()
 
-    def synth_content(self) -> str:
-        obj = deepcopy(self.obj)
-        insert_multiline_literals_inplace(obj)
-        return yaml.dumps(obj)
+    format = "yaml"
@@ -1,10 +1,31 @@
-from pathlib import Path
+import asyncio
+import os
+import sys
+import threading
+from pathlib import Path, PurePosixPath
 from textwrap import dedent
-
-from pytest import raises
-
-from synth_a_py import Dir, Project, SimpleFile
+from typing import Any, Awaitable, Callable, Dict, List, TypeVar
+
+from pytest import MonkeyPatch, mark, raises
+
+from synth_a_py import (
+    Dir,
+    EmptyFile,
+    File,
+    GitIgnore,
+    IniFile,
+    License,
+    Project,
+    SimpleFile,
+    SynthError,
+    SynthSummary,
+    TomlFile,
+    YamlFile,
+)
 from synth_a_py.base import _context_get
+from synth_a_py.manifest import Manifest
+
+T = TypeVar("T")
 
 
 def test_project(tmp_path: Path) -> None:
@@ -105,3 +126,679 @@ def test_subsequent_synth(tmp_path: Path) -> None:
 
     assert (project_path / "subdir" / "file.txt").read_text() == "Hello, synth-a-py!\n"
     assert (project_path / "subdir" / "file.txt").lstat().st_mode & 0o777 == 0o444
+
+
+def test_synth_summary(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        SimpleFile("a.txt", "a")
+        with Dir("subdir"):
+            SimpleFile("b.txt", "b")
+
+    assert spec.synth(tmp_path) == SynthSummary(written=2, unchanged=0)
+    assert spec.synth(tmp_path) == SynthSummary(written=2, unchanged=0)
+
+
+def test_incremental_synth(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        SimpleFile("same.txt", "unchanged")
+        SimpleFile("same-size.txt", "aaaa")
+        SimpleFile("resized.txt", "short")
+
+    spec.synth(tmp_path)
+    (tmp_path / "same.txt").chmod(0o644)
+    for name in ("same.txt", "same-size.txt", "resized.txt"):
+        os.utime(tmp_path / name, ns=(0, 0))
+
+    spec = Project()
+    with spec:
+        SimpleFile("same.txt", "unchanged")
+        SimpleFile("same-size.txt", "bbbb")
+        SimpleFile("resized.txt", "much longer")
+        SimpleFile("new.txt", "new")
+
+    summary = spec.synth(tmp_path, incremental=True)
+
+    assert summary == SynthSummary(written=3, unchanged=1)
+    assert (tmp_path / "same.txt").stat().st_mtime_ns == 0
+    assert (tmp_path / "same.txt").stat().st_mode & 0o777 == 0o444
+    assert (tmp_path / "same-size.txt").read_text() == "bbbb\n"
+    assert (tmp_path / "same-size.txt").stat().st_mtime_ns != 0
+    assert (tmp_path / "resized.txt").read_text() == "much longer\n"
+    assert (tmp_path / "new.txt").stat().st_mode & 0o777 == 0o444
+
+
+def test_threaded_synth(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        for d in range(4):
+            with Dir(f"dir{d}"):
+                for i in range(5):
+                    SimpleFile(f"file{i}.txt", f"{d}-{i}")
+
+    assert spec.synth(tmp_path, workers=4) == SynthSummary(written=20, unchanged=0)
+    assert spec.synth(tmp_path, workers=4, incremental=True) == SynthSummary(
+        written=0, unchanged=20
+    )
+
+    for d in range(4):
+        for i in range(5):
+            file_path = tmp_path / f"dir{d}" / f"file{i}.txt"
+            assert file_path.read_text() == f"{d}-{i}\n"
+            assert file_path.stat().st_mode & 0o777 == 0o444
+
+
+def test_threaded_synth_errors(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        for name in "abcde":
+            SimpleFile(f"{name}.txt", name)
+
+    (tmp_path / "d.txt").mkdir()
+    (tmp_path / "b.txt").mkdir()
+
+    with raises(SynthError) as exc_info:
+        spec.synth(tmp_path, workers=2)
+
+    assert list(exc_info.value.errors) == [tmp_path / "b.txt", tmp_path / "d.txt"]
+    for name in "ace":
+        assert (tmp_path / f"{name}.txt").read_text() == f"{name}\n"
+
+
+class UpperFile(SimpleFile):
+    def __init__(self, name: str, content: str) -> None:
+        super().__init__(name, content)
+        self.pid = os.getpid()
+
+    def synth_content(self) -> str:
+        assert self.pid != os.getpid()
+        return f"{os.getpid()}:{super().synth_content().upper()}"
+
+
+def test_multiprocess_synth(tmp_path: Path) -> None:
+    class LocalFile(File):
+        def synth_content(self) -> str:
+            return f"{os.getpid()}:local\n"
+
+    spec = Project()
+    with spec:
+        with Dir("dir"):
+            for i in range(10):
+                UpperFile(f"file{i}.txt", f"file {i}")
+        LocalFile("local.txt")
+
+    assert spec.synth(tmp_path, processes=2) == SynthSummary(written=11, unchanged=0)
+
+    pids = set()
+    for i in range(10):
+        pid, content = (tmp_path / "dir" / f"file{i}.txt").read_text().split(":")
+        assert content == f"FILE {i}\n"
+        pids.add(int(pid))
+    assert os.getpid() not in pids
+
+    # local classes can't be pickled so are rendered in this process
+    assert (tmp_path / "local.txt").read_text() == f"{os.getpid()}:local\n"
+
+
+class WorkerFailingFile(SimpleFile):
+    def __init__(self, name: str, content: str, exit: bool) -> None:
+        super().__init__(name, content)
+        self.pid = os.getpid()
+        self.exit = exit
+
+    def synth_content(self) -> str:
+        if self.pid != os.getpid():
+            if self.exit:
+                os._exit(1)
+            raise RuntimeError("can't render in a worker")
+        return super().synth_content()
+
+
+@mark.parametrize("exit", [False, True])
+def test_multiprocess_synth_renders_failures_locally(
+    tmp_path: Path, exit: bool
+) -> None:
+    spec = Project()
+    with spec:
+        for i in range(10):
+            WorkerFailingFile(f"file{i}.txt", f"file {i}", exit)
+
+    assert spec.synth(tmp_path, processes=2) == SynthSummary(written=10, unchanged=0)
+    for i in range(10):
+        assert (tmp_path / f"file{i}.txt").read_text() == f"file {i}\n"
+
+
+def test_render() -> None:
+    spec = Project()
+    with spec:
+        SimpleFile("b.txt", "b")
+        with Dir("subdir"):
+            SimpleFile("a.txt", "a")
+
+    rendered = spec.render()
+
+    assert list(rendered.items()) == [("b.txt", "b\n"), ("subdir/a.txt", "a\n")]
+
+
+def test_check(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        SimpleFile("same.txt", "same")
+        SimpleFile("changed.txt", "old")
+        SimpleFile("missing.txt", "missing")
+        SimpleFile("stale.txt", "stale")
+
+    spec.synth(tmp_path)
+    (tmp_path / "missing.txt").unlink()
+    (tmp_path / "handwritten.txt").write_text("handwritten")
+
+    spec = Project()
+    with spec:
+        SimpleFile("same.txt", "same")
+        SimpleFile("changed.txt", "new")
+        SimpleFile("missing.txt", "missing")
+
+    result = spec.check(tmp_path)
+
+    assert not result.ok
+    assert result.missing == ["missing.txt"]
+    assert result.changed == ["changed.txt"]
+    assert result.extra == ["stale.txt"]
+    assert list(result.diffs()) == [
+        dedent(
+            """\
+            --- a/changed.txt
+            +++ b/changed.txt
+            @@ -1 +1 @@
+            -old
+            +new
+            """
+        )
+    ]
+
+    spec.synth(tmp_path)
+    (tmp_path / "stale.txt").unlink()
+
+    assert spec.check(tmp_path).ok
+
+
+def test_walk() -> None:
+    spec = Project()
+    with spec:
+        a = Dir("a")
+        SimpleFile("b.txt", "b")
+        with a:
+            with Dir("c"):
+                c = SimpleFile("c.txt", "c")
+
+    walked = list(spec.walk())
+
+    assert [(str(path), f.name) for path, f in walked] == [
+        ("a/c/c.txt", "c.txt"),
+        ("b.txt", "b.txt"),
+    ]
+    assert list(spec.subpaths()) == ["a/c/c.txt", "b.txt"]
+    assert list(a.subpaths()) == ["c/c.txt"]
+    assert spec.get("a/c/c.txt") is c
+    assert spec.get(PurePosixPath("a") / "c" / "c.txt") is c
+    assert a.get("c/c.txt") is c
+    assert spec.get("a/c") is None
+    assert spec.get("missing.txt") is None
+
+
+def test_walk_after_add() -> None:
+    spec = Project()
+    with spec:
+        SimpleFile("b.txt", "b")
+
+    assert list(spec.subpaths()) == ["b.txt"]
+
+    with spec:
+        sub = Dir("sub")
+        assert list(spec.subpaths()) == ["b.txt"]
+        with sub:
+            SimpleFile("c.txt", "c")
+
+    assert list(sub.subpaths()) == ["c.txt"]
+    assert list(spec.subpaths()) == ["b.txt", "sub/c.txt"]
+
+    with spec:
+        with sub:
+            SimpleFile("d.txt", "d")
+
+    assert list(spec.subpaths()) == ["b.txt", "sub/c.txt", "sub/d.txt"]
+
+
+def test_subpaths_cached() -> None:
+    spec = Project()
+    with spec:
+        sub = Dir("dir")
+        with sub:
+            SimpleFile("a.txt", "a")
+
+    subpaths = spec.subpaths()
+    assert spec.subpaths() is subpaths
+    assert sub.subpaths() == ("a.txt",)
+
+    with spec:
+        with sub:
+            SimpleFile("b.txt", "b")
+
+    assert spec.subpaths() is not subpaths
+    assert spec.subpaths() == ("dir/a.txt", "dir/b.txt")
+
+
+def test_nodes_have_no_dict() -> None:
+    spec = Project()
+    with spec:
+        directory = Dir("dir")
+        with directory:
+            files = [
+                EmptyFile("empty"),
+                SimpleFile("file.txt", "content"),
+                GitIgnore(),
+                IniFile("file.ini", {}),
+                TomlFile("file.toml", {}),
+                YamlFile("file.yaml", {}),
+            ]
+        with Dir("mit"):
+            files.append(License.MIT("2020", "Joseph Egan"))
+        with Dir("apache"):
+            files.append(License.Apache("2.0", "2020", "Joseph Egan"))
+
+    for node in (spec, directory, *files):
+        assert not hasattr(node, "__dict__")
+
+
+class CountingFile(TomlFile):
+    renders = 0
+
+    def synth_content(self) -> str:
+        CountingFile.renders += 1
+        return super().synth_content()
+
+
+def test_memoized_render(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(File, "memoize", True)
+    monkeypatch.setattr(CountingFile, "renders", 0)
+
+    obj: Dict[str, Any] = {"tool": {"name": "a"}}
+    spec = Project()
+    with spec:
+        f = CountingFile("file.toml", obj)
+        GitIgnore()
+
+    assert spec.render()["file.toml"] == '[tool]\nname = "a"\n'
+    assert f.render() == '[tool]\nname = "a"\n'
+    assert CountingFile.renders == 1
+
+    obj["tool"]["name"] = "b"
+
+    assert f.render() == '[tool]\nname = "b"\n'
+    assert CountingFile.renders == 2
+
+    assert spec.render()[".gitignore"] == "!file.toml\n!.gitignore\n"
+    with spec:
+        SimpleFile("new.txt", "")
+    assert spec.render()[".gitignore"] == "!file.toml\n!.gitignore\n!new.txt\n"
+
+
+def test_render_not_memoized_by_default() -> None:
+    spec = Project()
+    with spec:
+        f = CountingFile("file.toml", {})
+
+    before = CountingFile.renders
+    f.render()
+    f.render()
+
+    assert CountingFile.renders == before + 2
+
+
+def test_incremental_streamed_synth(tmp_path: Path) -> None:
+    def synth(*lines: str) -> SynthSummary:
+        spec = Project()
+        with spec:
+            SimpleFile("file.txt", lines)
+        return spec.synth(tmp_path, incremental=True)
+
+    file_path = tmp_path / "file.txt"
+
+    assert synth("a", "b", "c") == SynthSummary(written=1, unchanged=0)
+    assert file_path.read_text() == "a\nb\nc\n"
+
+    os.utime(file_path, ns=(0, 0))
+    assert synth("a", "b", "c") == SynthSummary(written=0, unchanged=1)
+    assert file_path.stat().st_mtime_ns == 0
+
+    assert synth("a", "x", "c") == SynthSummary(written=1, unchanged=0)
+    assert file_path.read_text() == "a\nx\nc\n"
+    assert file_path.stat().st_mtime_ns != 0
+
+    assert synth("a", "x") == SynthSummary(written=1, unchanged=0)
+    assert file_path.read_text() == "a\nx\n"
+
+    assert synth("a", "x", "c", "d") == SynthSummary(written=1, unchanged=0)
+    assert file_path.read_text() == "a\nx\nc\nd\n"
+    assert file_path.stat().st_mode & 0o777 == 0o444
+
+
+def test_overridden_synth_content_is_used(tmp_path: Path) -> None:
+    class ReversedFile(SimpleFile):
+        def synth_content(self) -> str:
+            return super().synth_content()[::-1]
+
+    spec = Project()
+    with spec:
+        ReversedFile("file.txt", ("a", "b"))
+
+    spec.synth(tmp_path)
+
+    assert (tmp_path / "file.txt").read_text() == "\nb\na"
+
+
+def test_dedupe_synth(tmp_path: Path) -> None:
+    def project(changed: str = "same") -> Project:
+        spec = Project()
+        with spec:
+            for name in ("a", "b", "c"):
+                with Dir(name):
+                    SimpleFile("file.txt", changed if name == "a" else "same")
+            SimpleFile("other.txt", "other")
+        return spec
+
+    size = len("same\n")
+    paths = [tmp_path / name / "file.txt" for name in ("a", "b", "c")]
+
+    summary = project().synth(tmp_path, dedupe=True)
+
+    assert summary == SynthSummary(written=4, unchanged=0, bytes_saved=2 * size)
+    assert len({path.stat().st_ino for path in paths}) == 1
+    assert paths[0].stat().st_nlink == 3
+    assert (tmp_path / "other.txt").stat().st_nlink == 1
+    for path in paths:
+        assert path.read_text() == "same\n"
+        assert path.stat().st_mode & 0o777 == 0o444
+
+    summary = project().synth(tmp_path, dedupe=True, incremental=True, workers=2)
+
+    assert summary == SynthSummary(written=0, unchanged=4, bytes_saved=2 * size)
+
+    # writing a linked file doesn't change the files linked to it
+    project("changed").synth(tmp_path, incremental=True)
+
+    assert paths[0].read_text() == "changed\n"
+    assert paths[1].read_text() == "same\n"
+    assert paths[2].read_text() == "same\n"
+    assert paths[1].stat().st_ino == paths[2].stat().st_ino
+    assert paths[0].stat().st_mode & 0o777 == 0o444
+
+
+def test_streamed_write_to_linked_file(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        for name in ("a", "b"):
+            with Dir(name):
+                SimpleFile("file.txt", ("same", "lines"))
+    spec.synth(tmp_path, dedupe=True)
+
+    spec = Project()
+    with spec:
+        with Dir("a"):
+            SimpleFile("file.txt", ("same", "lines", "added"))
+    spec.synth(tmp_path, incremental=True)
+
+    assert (tmp_path / "a" / "file.txt").read_text() == "same\nlines\nadded\n"
+    assert (tmp_path / "b" / "file.txt").read_text() == "same\nlines\n"
+
+
+def run(coroutine: Awaitable[T]) -> T:
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_asynth(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        YamlFile("a.yml", {"a": [1, 2]})
+        with Dir("dir"):
+            TomlFile("b.toml", {"b": {"c": 1}})
+            for i in range(20):
+                SimpleFile(f"{i}.txt", str(i))
+
+    assert run(spec.asynth(tmp_path, concurrency=3)) == SynthSummary(
+        written=22, unchanged=0
+    )
+    assert spec.check(tmp_path).ok
+    assert run(spec.asynth(tmp_path, incremental=True)) == SynthSummary(
+        written=0, unchanged=22
+    )
+
+
+def test_asynth_yields_to_event_loop(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        for i in range(50):
+            SimpleFile(f"{i}.txt", str(i))
+
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    async def main() -> None:
+        ticker = asyncio.ensure_future(tick())
+        await spec.asynth(tmp_path, concurrency=1)
+        ticker.cancel()
+
+    run(main())
+
+    assert ticks >= 50
+
+
+def test_asynth_errors(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        for name in "abcde":
+            SimpleFile(f"{name}.txt", name)
+
+    (tmp_path / "d.txt").mkdir()
+    (tmp_path / "b.txt").mkdir()
+
+    with raises(SynthError) as exc_info:
+        run(spec.asynth(tmp_path, concurrency=2))
+
+    assert list(exc_info.value.errors) == [tmp_path / "b.txt", tmp_path / "d.txt"]
+    for name in "ace":
+        assert (tmp_path / f"{name}.txt").read_text() == f"{name}\n"
+
+
+def test_asynth_cancelled(tmp_path: Path) -> None:
+    started = threading.Event()
+    release = threading.Event()
+
+    class BlockingFile(SimpleFile):
+        def synth_content(self) -> str:
+            started.set()
+            release.wait()
+            return super().synth_content()
+
+    spec = Project()
+    with spec:
+        SimpleFile("before.txt", "before")
+        BlockingFile("blocking.txt", "x" * 100_000)
+        for i in range(20):
+            SimpleFile(f"{i}.txt", str(i))
+
+    async def main() -> None:
+        task = asyncio.ensure_future(spec.asynth(tmp_path, concurrency=2))
+        await asyncio.get_event_loop().run_in_executor(None, started.wait)
+        task.cancel()
+        release.set()
+        with raises(asyncio.CancelledError):
+            await task
+
+    run(main())
+
+    # every file is either fully written or not written at all
+    rendered = spec.render()
+    for path in tmp_path.iterdir():
+        assert path.read_text() == rendered[path.name]
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+# the contextvars backport doesn't give each asyncio task its own context
+@mark.skipif(sys.version_info < (3, 7), reason="requires python3.7 or higher")
+def test_asynth_context(tmp_path: Path) -> None:
+    # projects built concurrently in separate tasks don't see each other
+    async def build(name: str) -> SynthSummary:
+        spec = Project()
+        with spec:
+            SimpleFile(f"{name}1.txt", name)
+            await asyncio.sleep(0)
+            with Dir("dir"):
+                await asyncio.sleep(0)
+                SimpleFile(f"{name}2.txt", name)
+        return await spec.asynth(tmp_path / name)
+
+    async def main() -> List[SynthSummary]:
+        return list(await asyncio.gather(build("a"), build("b")))
+
+    assert run(main()) == [SynthSummary(written=2, unchanged=0)] * 2
+    assert sorted(p.name for p in (tmp_path / "a").rglob("*.txt")) == [
+        "a1.txt",
+        "a2.txt",
+    ]
+    assert sorted(p.name for p in (tmp_path / "b").rglob("*.txt")) == [
+        "b1.txt",
+        "b2.txt",
+    ]
+
+
+def test_lazy_content(tmp_path: Path) -> None:
+    built: List[str] = []
+
+    def build(name: str) -> Callable[[], Any]:
+        def obj() -> Any:
+            built.append(name)
+            return {"name": name}
+
+        return obj
+
+    spec = Project()
+    with spec:
+        TomlFile("a.toml", build("a"))
+        with Dir("dir"):
+            YamlFile("b.yml", build("b"))
+            IniFile("c.ini", lambda: {"section": {"key": "c"}})
+            SimpleFile("d.txt", lambda: ("d", "e"))
+
+    assert built == []
+
+    spec.synth(tmp_path)
+
+    assert built == ["a", "b"]
+    assert (tmp_path / "a.toml").read_text() == 'name = "a"\n'
+    assert (tmp_path / "dir" / "b.yml").read_text() == "name: b\n"
+    assert (tmp_path / "dir" / "c.ini").read_text() == "[section]\nkey = c\n"
+    assert (tmp_path / "dir" / "d.txt").read_text() == "d\ne\n"
+
+    spec.synth(tmp_path)
+
+    # built once, then kept
+    assert built == ["a", "b"]
+
+
+def lazy_upper() -> str:
+    return "lazy"
+
+
+def test_lazy_content_multiprocess(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        # called by the worker
+        UpperFile("module.txt", lazy_upper)  # type: ignore
+        # can't be pickled, so rendered locally
+        SimpleFile("lambda.txt", lambda: "lambda")
+
+    spec.synth(tmp_path, processes=2)
+
+    assert (tmp_path / "module.txt").read_text().endswith(":LAZY\n")
+    assert (tmp_path / "lambda.txt").read_text() == "lambda\n"
+
+
+def only_project(built: List[str], old: bool = False) -> Project:
+    def content(name: str) -> Callable[[], str]:
+        return lambda: built.append(name) or name  # type: ignore
+
+    spec = Project()
+    with spec:
+        SimpleFile("README.md", content("README.md"))
+        if old:
+            SimpleFile("old.txt", "old")
+        with Dir("packages"):
+            for name in ("a", "b"):
+                with Dir(name):
+                    SimpleFile("setup.cfg", content(f"{name}/setup.cfg"))
+                    SimpleFile("ci.yml", content(f"{name}/ci.yml"))
+                    if old:
+                        SimpleFile("old.txt", "old")
+    return spec
+
+
+def test_render_only() -> None:
+    built: List[str] = []
+    spec = only_project(built)
+
+    assert list(spec.render(only="packages/a")) == [
+        "packages/a/setup.cfg",
+        "packages/a/ci.yml",
+    ]
+    assert list(spec.render(only=["*.yml", "README.md"])) == [
+        "README.md",
+        "packages/a/ci.yml",
+        "packages/b/ci.yml",
+    ]
+    assert list(spec.render(only="packages/*/setup.cfg")) == [
+        "packages/a/setup.cfg",
+        "packages/b/setup.cfg",
+    ]
+    assert list(spec.render(only=[])) == []
+    assert list(spec.render(only="./packages/a/")) == [
+        "packages/a/setup.cfg",
+        "packages/a/ci.yml",
+    ]
+    assert len(list(spec.render(only="."))) == 5
+    assert built == ["a/setup.cfg", "a/ci.yml", "README.md", "b/ci.yml", "b/setup.cfg"]
+
+
+def test_synth_only(tmp_path: Path) -> None:
+    built: List[str] = []
+    spec = only_project(built, old=True)
+    spec.synth(tmp_path, manifest=True)
+
+    built.clear()
+    spec = only_project(built)
+    summary = spec.synth(tmp_path, only=["packages/b"], manifest=True)
+
+    assert summary == SynthSummary(written=2, unchanged=0, removed=1)
+    assert built == ["b/setup.cfg", "b/ci.yml"]
+    # files outside the selection aren't pruned, and stay in the manifest
+    assert sorted(Manifest.load(tmp_path).entries) == [
+        "README.md",
+        "old.txt",
+        "packages/a/ci.yml",
+        "packages/a/old.txt",
+        "packages/a/setup.cfg",
+        "packages/b/ci.yml",
+        "packages/b/setup.cfg",
+    ]
+    assert (tmp_path / "packages" / "a" / "old.txt").exists()
+    assert not (tmp_path / "packages" / "b" / "old.txt").exists()
@@ -0,0 +1,147 @@
+from pathlib import Path
+from textwrap import dedent
+
+from pytest import CaptureFixture
+
+from synth_a_py.cli import discover, main, run_script
+
+
+def script(directory: Path, content: str) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / "synth.py"
+    path.write_text(dedent(content))
+    return path
+
+
+def package(directory: Path, name: str) -> Path:
+    # each package imports a local helper module of the same name
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "helper.py").write_text(f"NAME = {name!r}\n")
+    return script(
+        directory,
+        """\
+        from helper import NAME
+
+        from synth_a_py import Project, SimpleFile
+
+        spec = Project()
+        with spec:
+            SimpleFile("name.txt", NAME)
+
+        spec.synth()
+        """,
+    )
+
+
+def test_discover(tmp_path: Path) -> None:
+    a = package(tmp_path / "a", "a")
+    b = package(tmp_path / "b" / "nested", "b")
+    package(tmp_path / ".hidden", "hidden")
+    package(tmp_path / "node_modules" / "c", "c")
+
+    assert discover(tmp_path) == [a, b]
+
+
+def test_run_script(tmp_path: Path) -> None:
+    result = run_script(package(tmp_path / "a", "a"), False, False)
+
+    assert result.error is None
+    assert (result.written, result.unchanged) == (1, 0)
+    assert (tmp_path / "a" / "name.txt").read_text() == "a\n"
+
+    result = run_script(tmp_path / "a" / "synth.py", True, False)
+
+    assert (result.written, result.unchanged) == (0, 1)
+
+
+def test_main(tmp_path: Path, capsys: CaptureFixture[str]) -> None:
+    package(tmp_path / "a", "a")
+    package(tmp_path / "b", "b")
+
+    assert main([str(tmp_path), "--jobs", "1"]) == 0
+
+    out = capsys.readouterr().out
+    assert "a/synth.py: 1 written, 0 unchanged" in out
+    assert "b/synth.py: 1 written, 0 unchanged" in out
+    assert "2 projects in" in out
+    assert (tmp_path / "a" / "name.txt").read_text() == "a\n"
+    assert (tmp_path / "b" / "name.txt").read_text() == "b\n"
+
+    assert main([str(tmp_path), "--incremental"]) == 0
+
+    assert "a/synth.py: 0 written, 1 unchanged" in capsys.readouterr().out
+
+
+def test_main_isolates_scripts(tmp_path: Path) -> None:
+    # run by the same worker, after a script changing library state
+    script(
+        tmp_path / "a",
+        """\
+        from synth_a_py import File, Project, TomlFile, serializers
+
+        serializers.set_default("toml", "fast")
+        TomlFile.memoize = True
+        File.detachable = False
+
+        spec = Project()
+        with spec:
+            TomlFile("x.toml", {"z": [1, 2]})
+
+        spec.synth()
+        """,
+    )
+    script(
+        tmp_path / "b",
+        """\
+        from synth_a_py import File, Project, TomlFile, serializers
+
+        assert serializers.get_default("toml") == "toml"
+        assert not TomlFile.memoize
+        assert File.detachable
+
+        spec = Project()
+        with spec:
+            TomlFile("x.toml", {"z": [1, 2]})
+
+        spec.synth()
+        """,
+    )
+
+    assert main([str(tmp_path), "--jobs", "1"]) == 0
+
+    assert (tmp_path / "a" / "x.toml").read_text() == "z = [1, 2]\n"
+    assert (tmp_path / "b" / "x.toml").read_text() == "z = [ 1, 2,]\n"
+
+
+def test_main_failure(tmp_path: Path, capsys: CaptureFixture[str]) -> None:
+    package(tmp_path / "a", "a")
+    script(tmp_path / "b", 'raise RuntimeError("broken")\n')
+    script(tmp_path / "c", "import sys\nsys.exit(0)\n")
+
+    assert main([str(tmp_path)]) == 1
+
+    out = capsys.readouterr().out
+    assert "b/synth.py: failed" in out
+    assert "RuntimeError: broken" in out
+    assert "c/synth.py: 0 written, 0 unchanged" in out
+    assert "3 projects in" in out and ": 1 failed" in out
+    assert (tmp_path / "a" / "name.txt").read_text() == "a\n"
+
+
+def test_main_check(tmp_path: Path, capsys: CaptureFixture[str]) -> None:
+    package(tmp_path / "a", "a")
+
+    assert main([str(tmp_path), "--check"]) == 1
+    assert not (tmp_path / "a" / "name.txt").exists()
+    out = capsys.readouterr().out
+    assert "a/synth.py: out of date" in out
+    assert "name.txt (missing)" in out
+
+    assert main([str(tmp_path)]) == 0
+    assert main([str(tmp_path), "--check"]) == 0
+    assert "a/synth.py: in sync" in capsys.readouterr().out
+
+
+def test_main_without_scripts(tmp_path: Path, capsys: CaptureFixture[str]) -> None:
+    assert main([str(tmp_path)]) == 1
+    assert "no synth.py found" in capsys.readouterr().err
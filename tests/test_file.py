@@ -1,7 +1,10 @@
 from pathlib import Path
 from textwrap import dedent
+from typing import Any, Iterator
 
-from synth_a_py import EmptyFile, Project, SimpleFile
+from pytest import raises
+
+from synth_a_py import EmptyFile, Project, SerializedFile, SimpleFile, serializers
 
 
 def test_empty_file(tmp_path: Path) -> None:
@@ -67,3 +70,32 @@ def test_simple_file_from_list(tmp_path: Path) -> None:
         fermentum cursus turpis
         """
     )
+
+
+def _dump_lines(obj: Any) -> Iterator[str]:
+    for item in obj:
+        yield f"{item}\n"
+
+
+serializers.register("lines", "lines", _dump_lines)
+
+
+class LinesFile(SerializedFile):
+    __slots__ = ()
+
+    format = "lines"
+
+
+def test_serialized_file(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        f = LinesFile("file", lambda: ["a", "b"])
+
+    spec.synth(tmp_path)
+
+    assert (tmp_path / "file").read_text() == "a\nb\n"
+    assert f.cache_key()[0] == "lines"
+
+    with raises(ValueError, match="Unknown lines serializer 'fast'"):
+        with Project():
+            LinesFile("other", [], serializer="fast")
@@ -42,3 +42,52 @@ def test_gitignore(tmp_path: Path) -> None:
         !needed.so
         """
     )
+
+
+def test_gitignore_multiprocess(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        GitIgnore(ignore=["*"])
+        with Dir("src"):
+            SimpleFile("main.py", "")
+
+    spec.synth(tmp_path, processes=2)
+
+    assert (tmp_path / ".gitignore").read_text() == dedent(
+        """\
+        *
+        !.gitignore
+        !src/main.py
+        """
+    )
+
+
+def test_nested_gitignore(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        GitIgnore(ignore=["*"])
+        with Dir("pkg"):
+            GitIgnore(ignore=["*"], allow=["src/"])
+            with Dir("src"):
+                SimpleFile("main.py", "")
+        SimpleFile("README.md", "")
+
+    spec.synth(tmp_path)
+
+    assert (tmp_path / ".gitignore").read_text() == dedent(
+        """\
+        *
+        !.gitignore
+        !pkg/.gitignore
+        !pkg/src/main.py
+        !README.md
+        """
+    )
+    assert (tmp_path / "pkg" / ".gitignore").read_text() == dedent(
+        """\
+        *
+        !.gitignore
+        !src/main.py
+        !src/
+        """
+    )
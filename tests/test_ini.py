@@ -1,5 +1,10 @@
+from configparser import ConfigParser, DuplicateOptionError
+from io import StringIO
 from pathlib import Path
 from textwrap import dedent
+from typing import Any, Dict
+
+import pytest
 
 from synth_a_py import IniFile, Project
 
@@ -28,3 +33,90 @@ def test_ini(tmp_path: Path) -> None:
         plugins = returns.contrib.mypy.returns_plugin
         """
     )
+
+
+def test_ini_defaults_are_written_first() -> None:
+    obj = {
+        "section": {"Key": "value", "multiline": "a\nb"},
+        "DEFAULT": {"default": 1},
+        "empty": {},
+    }
+
+    spec = Project()
+    with spec:
+        f = IniFile("setup.cfg", obj)
+
+    assert f.synth_content() == dedent(
+        """\
+        [DEFAULT]
+        default = 1
+
+        [section]
+        key = value
+        multiline = a
+        \tb
+
+        [empty]
+        """
+    )
+
+
+def test_ini_matches_config_parser() -> None:
+    obj: Dict[str, Dict[str, Any]] = {
+        "flake8": {"max-line-length": 88, "extend-ignore": "E203,\nW503"},
+        "tox:tox": {"envlist": "py36, py37", "Isolated_Build": True, "empty": ""},
+        "testenv": {"commands": "pytest {posargs}", "allowlist_externals": "make"},
+        "DEFAULT": {},
+    }
+    config = ConfigParser()
+    config.read_dict(obj)
+    with StringIO() as buf:
+        config.write(buf)
+        expected = buf.getvalue().rstrip() + "\n"
+
+    spec = Project()
+    with spec:
+        f = IniFile("tox.ini", obj)
+
+    assert f.synth_content() == expected
+
+
+def test_ini_validate() -> None:
+    obj = {"section": {"key": "a", "KEY": "b"}}
+
+    spec = Project()
+    with spec:
+        f = IniFile("setup.cfg", obj)
+        validated = IniFile("validated.cfg", obj, validate=True)
+        interpolated = IniFile("interpolated.cfg", {"a": {"b": "100%"}}, validate=True)
+
+    assert f.synth_content() == "[section]\nkey = a\nkey = b\n"
+    with pytest.raises(DuplicateOptionError):
+        validated.synth_content()
+    with pytest.raises(ValueError, match="interpolation"):
+        interpolated.synth_content()
+
+
+def test_ini_unnamed_section_options_are_defaults() -> None:
+    obj = {"x": {"b": "2"}, "": {"a": "1"}, "DEFAULT": {"c": "3"}}
+    config = ConfigParser()
+    config.read_dict(obj)
+    with StringIO() as buf:
+        config.write(buf)
+        expected = buf.getvalue().rstrip() + "\n"
+
+    spec = Project()
+    with spec:
+        f = IniFile("setup.cfg", obj)
+
+    assert f.synth_content() == expected
+    assert f.synth_content().startswith("[DEFAULT]\na = 1\nc = 3\n\n[x]\n")
+
+
+def test_ini_rejects_none() -> None:
+    spec = Project()
+    with spec:
+        f = IniFile("setup.cfg", {"section": {"key": None}})
+
+    with pytest.raises(TypeError, match="key"):
+        f.synth_content()
@@ -0,0 +1,65 @@
+import json
+from pathlib import Path
+from textwrap import dedent
+
+from synth_a_py import JsonFile, Project, serializers
+
+
+def test_json(tmp_path: Path) -> None:
+    spec = Project()
+    with spec:
+        JsonFile(
+            "package.json",
+            {
+                "name": "my-project",
+                "version": "0.1.0",
+                "scripts": {"test": "jest", "build": "tsc"},
+                "files": ["dist"],
+                "private": True,
+                "main": None,
+            },
+        )
+
+    spec.synth(tmp_path)
+
+    assert (tmp_path / "package.json").read_text() == dedent(
+        """\
+        {
+          "files": [
+            "dist"
+          ],
+          "main": null,
+          "name": "my-project",
+          "private": true,
+          "scripts": {
+            "build": "tsc",
+            "test": "jest"
+          },
+          "version": "0.1.0"
+        }
+        """
+    )
+
+
+def test_json_chunks(tmp_path: Path) -> None:
+    obj = {f"key{i}": {"values": list(range(100)), "name": f"é{i}"} for i in range(100)}
+
+    spec = Project()
+    with spec:
+        f = JsonFile("large.json", lambda: obj)
+
+    chunks = list(f.synth_chunks())
+    assert len(chunks) > 1
+    assert f.synth_content() == json.dumps(obj, sort_keys=True, indent=2) + "\n"
+
+    spec.synth(tmp_path)
+    assert json.loads((tmp_path / "large.json").read_text()) == obj
+
+
+def test_json_serializer() -> None:
+    spec = Project()
+    with spec:
+        f = JsonFile("file.json", [], serializer="json")
+
+    assert serializers.names("json") == ["json"]
+    assert f.synth_content() == "[]\n"
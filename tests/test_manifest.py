@@ -0,0 +1,105 @@
+import json
+import os
+from pathlib import Path
+
+from pytest import MonkeyPatch
+
+from synth_a_py import Dir, Project, SimpleFile, SynthSummary
+from synth_a_py.manifest import MANIFEST_NAME, Manifest
+
+
+def project(*names: str, content: str = "content") -> Project:
+    spec = Project()
+    with spec:
+        for name in names:
+            with Dir(name):
+                SimpleFile("file.txt", content)
+    return spec
+
+
+def test_manifest_written(tmp_path: Path) -> None:
+    project("a", "b").synth(tmp_path, manifest=True)
+
+    data = json.loads((tmp_path / MANIFEST_NAME).read_text())
+    entry = data["files"]["a/file.txt"]
+    stat = (tmp_path / "a" / "file.txt").stat()
+
+    assert data["version"] == 1
+    assert sorted(data["files"]) == ["a/file.txt", "b/file.txt"]
+    assert entry["size"] == stat.st_size
+    assert entry["mtime_ns"] == stat.st_mtime_ns
+    assert len(entry["sha256"]) == 64
+
+
+def test_manifest_mode(tmp_path: Path) -> None:
+    umask = os.umask(0o022)
+    try:
+        project("a").synth(tmp_path, manifest=True)
+    finally:
+        os.umask(umask)
+
+    assert (tmp_path / MANIFEST_NAME).stat().st_mode & 0o777 == 0o644
+
+
+def test_manifest_prunes_undeclared_files(tmp_path: Path) -> None:
+    project("a", "b", "c").synth(tmp_path, manifest=True)
+    # changed by hand since, so left alone
+    path = tmp_path / "c" / "file.txt"
+    path.chmod(0o644)
+    path.write_text("edited")
+
+    summary = project("a").synth(tmp_path, manifest=True)
+
+    assert summary == SynthSummary(written=1, unchanged=0, removed=1)
+    assert not (tmp_path / "b").exists()
+    assert path.read_text() == "edited"
+    assert list(Manifest.load(tmp_path).entries) == ["a/file.txt"]
+
+
+def test_manifest_skips_reading_unchanged_files(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    project("a", "b").synth(tmp_path, manifest=True)
+    path = tmp_path / "b" / "file.txt"
+    mtime_ns = path.stat().st_mtime_ns
+
+    def fail(*args: object, **kwargs: object) -> None:
+        raise AssertionError("file read back")
+
+    monkeypatch.setattr(Path, "read_bytes", fail)
+    monkeypatch.setattr(Path, "open", fail)
+    summary = project("a", "b").synth(tmp_path, incremental=True, manifest=True)
+    monkeypatch.undo()
+
+    assert summary == SynthSummary(written=0, unchanged=2)
+    assert path.stat().st_mtime_ns == mtime_ns
+
+    # a changed stat means the file is compared as usual
+    os.utime(path, ns=(mtime_ns, mtime_ns + 1_000_000_000))
+    summary = project("a", "b").synth(tmp_path, incremental=True, manifest=True)
+
+    assert summary == SynthSummary(written=0, unchanged=2)
+
+    summary = project("a", "b", content="changed").synth(
+        tmp_path, incremental=True, manifest=True
+    )
+
+    assert summary == SynthSummary(written=2, unchanged=0)
+    assert path.read_text() == "changed\n"
+
+
+def test_invalid_manifest_ignored(tmp_path: Path) -> None:
+    (tmp_path / MANIFEST_NAME).write_text("not json")
+
+    summary = project("a").synth(tmp_path, manifest=True)
+
+    assert summary == SynthSummary(written=1, unchanged=0)
+    assert list(Manifest.load(tmp_path).entries) == ["a/file.txt"]
+
+
+def test_check_reports_manifest_extras(tmp_path: Path) -> None:
+    project("a", "b").synth(tmp_path, manifest=True)
+
+    result = project("a").check(tmp_path)
+
+    assert result.extra == ["b/file.txt"]
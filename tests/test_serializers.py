@@ -0,0 +1,39 @@
+from typing import Any, Iterator
+
+import pytest
+
+from synth_a_py import serializers
+
+
+def upper(obj: Any) -> Iterator[str]:
+    yield str(obj).upper()
+
+
+def lower(obj: Any) -> Iterator[str]:
+    yield str(obj).lower()
+
+
+def test_register() -> None:
+    serializers.register("test-register", "upper", upper)
+    serializers.register("test-register", "lower", lower)
+
+    assert serializers.names("test-register") == ["upper", "lower"]
+    assert serializers.get_default("test-register") == "upper"
+    assert serializers.get("test-register") is upper
+    assert serializers.get("test-register", "lower") is lower
+
+    serializers.set_default("test-register", "lower")
+    assert serializers.get("test-register") is lower
+
+    serializers.register("test-register", "upper", upper, default=True)
+    assert serializers.get("test-register") is upper
+
+
+def test_unknown() -> None:
+    serializers.register("test-unknown", "upper", upper)
+
+    with pytest.raises(ValueError, match="expected one of: 'upper'"):
+        serializers.get("test-unknown", "lower")
+    with pytest.raises(ValueError):
+        serializers.set_default("test-unknown", "lower")
+    assert serializers.names("test-none") == []
@@ -1,7 +1,10 @@
 from pathlib import Path
 from textwrap import dedent
 
-from synth_a_py import Project, TomlFile
+import pytest
+import toml
+
+from synth_a_py import Project, TomlFile, serializers
 
 
 def test_toml(tmp_path: Path) -> None:
@@ -57,3 +60,86 @@ def test_toml(tmp_path: Path) -> None:
         extras = [ "blue", "green",]
         """
     )
+
+
+def test_toml_chunks_match_toml_dumps() -> None:
+    obj = {
+        "top": 1,
+        "a": {"b": {"c": {"d": 1}}, "e": [{"f": 1}, {"g": 2}]},
+        "h": {},
+        "i": {"j": {}, "k": "l"},
+    }
+
+    spec = Project()
+    with spec:
+        f = TomlFile("file.toml", obj)
+
+    assert len(list(f.synth_chunks())) > 1
+    assert f.synth_content() == toml.dumps(obj)
+
+
+def test_toml_fast(tmp_path: Path) -> None:
+    obj = {
+        "top": 1,
+        "a": {"b": {"c": {"d": 1}}, "e": [{"f": 1}, {"g": [True, False]}]},
+        "h": {},
+        "i": {"j": {}, "k": 'l"\n\x01'},
+        "key with spaces": [[1, 2], ["a"]],
+    }
+
+    spec = Project()
+    with spec:
+        f = TomlFile("file.toml", obj, serializer="fast")
+
+    assert f.synth_content() == dedent(
+        """\
+        top = 1
+        "key with spaces" = [[1, 2], ["a"]]
+
+        [a.b.c]
+        d = 1
+
+        [[a.e]]
+        f = 1
+
+        [[a.e]]
+        g = [true, false]
+
+        [h]
+
+        [i]
+        k = "l\\"\\n\\u0001"
+
+        [i.j]
+        """
+    )
+    assert toml.loads(f.synth_content()) == obj
+    assert "".join(f.synth_chunks()) == f.synth_content()
+
+
+def test_toml_serializer_default() -> None:
+    obj = {"a": [1, 2]}
+
+    spec = Project()
+    with spec:
+        default = TomlFile("default.toml", obj)
+        compat = TomlFile("compat.toml", obj, serializer="toml")
+        fast = TomlFile("fast.toml", obj, serializer="fast")
+
+    assert default.cache_key() != fast.cache_key()
+
+    serializers.set_default("toml", "fast")
+    try:
+        assert default.synth_content() == "a = [1, 2]\n"
+        assert default.cache_key() == fast.cache_key()
+        assert compat.synth_content() == "a = [ 1, 2,]\n"
+    finally:
+        serializers.set_default("toml", "toml")
+
+    assert default.synth_content() == "a = [ 1, 2,]\n"
+
+
+def test_toml_unknown_serializer() -> None:
+    with Project():
+        with pytest.raises(ValueError, match="'fast'"):
+            TomlFile("file.toml", {}, serializer="slow")
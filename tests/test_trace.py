@@ -0,0 +1,127 @@
+import json
+from pathlib import Path
+from threading import get_ident
+from typing import Dict, List
+
+from pytest import raises
+
+from synth_a_py import (
+    ChromeTrace,
+    Dir,
+    Project,
+    RenderEvent,
+    SimpleFile,
+    SynthError,
+    SynthObserver,
+    WriteEvent,
+)
+
+
+class RecordingObserver(SynthObserver):
+    def __init__(self) -> None:
+        self.renders: List[RenderEvent] = []
+        self.writes: List[WriteEvent] = []
+
+    def rendered(self, event: RenderEvent) -> None:
+        self.renders.append(event)
+
+    def written(self, event: WriteEvent) -> None:
+        self.writes.append(event)
+
+    def outcomes(self, root: Path) -> Dict[str, str]:
+        return {
+            event.path.relative_to(root).as_posix(): event.outcome
+            for event in self.writes
+        }
+
+
+def project(content: str = "content") -> Project:
+    spec = Project()
+    with spec:
+        SimpleFile("a.txt", "same")
+        with Dir("dir"):
+            SimpleFile("b.txt", "same")
+            SimpleFile("c.txt", content)
+    return spec
+
+
+def test_observer(tmp_path: Path) -> None:
+    observer = RecordingObserver()
+    project().synth(tmp_path, observer=observer)
+
+    assert [event.path for event in observer.renders] == [
+        tmp_path / "a.txt",
+        tmp_path / "dir" / "b.txt",
+        tmp_path / "dir" / "c.txt",
+    ]
+    assert [event.size for event in observer.renders] == [5, 5, 8]
+    assert {event.file_type for event in observer.renders} == {"SimpleFile"}
+    for render in observer.renders:
+        assert render.start <= render.end
+        assert render.thread == get_ident()
+    for write in observer.writes:
+        assert write.start <= write.end
+        assert write.thread == get_ident()
+    assert observer.outcomes(tmp_path) == {
+        "a.txt": "written",
+        "dir/b.txt": "written",
+        "dir/c.txt": "written",
+    }
+
+
+def test_observer_outcomes(tmp_path: Path) -> None:
+    project().synth(tmp_path, manifest=True)
+
+    observer = RecordingObserver()
+    project("changed").synth(
+        tmp_path, incremental=True, dedupe=True, manifest=True, observer=observer
+    )
+
+    assert observer.outcomes(tmp_path) == {
+        "a.txt": "skipped",
+        "dir/b.txt": "linked",
+        "dir/c.txt": "written",
+    }
+
+    observer = RecordingObserver()
+    project("changed").synth(tmp_path, incremental=True, observer=observer)
+
+    assert set(observer.outcomes(tmp_path).values()) == {"unchanged"}
+
+
+def test_observer_threaded_failures(tmp_path: Path) -> None:
+    (tmp_path / "dir" / "b.txt").mkdir(parents=True)
+
+    observer = RecordingObserver()
+    with raises(SynthError):
+        project().synth(tmp_path, workers=2, observer=observer)
+
+    assert observer.outcomes(tmp_path) == {
+        "a.txt": "written",
+        "dir/b.txt": "failed",
+        "dir/c.txt": "written",
+    }
+    assert all(event.thread != get_ident() for event in observer.writes)
+
+
+def test_observer_multiprocess(tmp_path: Path) -> None:
+    observer = RecordingObserver()
+    project().synth(tmp_path, processes=2, observer=observer)
+
+    assert len(observer.renders) == 3
+    assert len(observer.writes) == 3
+
+
+def test_chrome_trace(tmp_path: Path) -> None:
+    trace = ChromeTrace()
+    project().synth(tmp_path / "out", observer=trace)
+    trace.save(tmp_path / "trace.json")
+
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+
+    assert [event["cat"] for event in events] == ["render", "write"] * 3
+    assert {event["ph"] for event in events} == {"X"}
+    assert events[0]["name"] == str(tmp_path / "out" / "a.txt")
+    assert events[0]["args"] == {"type": "SimpleFile", "bytes": 5}
+    assert events[1]["args"] == {"outcome": "written"}
+    assert all(event["dur"] >= 0 for event in events)
@@ -0,0 +1,45 @@
+from typing import List
+
+from synth_a_py.utils import Lazy, init_mix_ins
+
+
+def test_init_mix_ins() -> None:
+    calls: List[str] = []
+
+    class A:
+        def __init__(self) -> None:
+            calls.append("A")
+
+    class B:
+        def __init__(self, arg: str) -> None:
+            calls.append("B")
+
+    class C(A, B):
+        def __init__(self) -> None:
+            init_mix_ins(self, C)
+
+    C()
+    C()
+
+    assert calls == ["A", "A"]
+
+
+def test_lazy() -> None:
+    calls: List[int] = []
+
+    class Holder:
+        __slots__ = ("_value",)
+
+        value = Lazy("_value")
+
+    holder = Holder()
+    holder.value = lambda: calls.append(1) or "value"  # type: ignore
+
+    assert calls == []
+    assert holder.value == "value"
+    assert holder.value == "value"
+    assert calls == [1]
+
+    holder.value = "plain"
+
+    assert holder.value == "plain"
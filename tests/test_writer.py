@@ -0,0 +1,231 @@
+import os
+from pathlib import Path
+from typing import Any, Iterator, List
+
+from pytest import FixtureRequest, MonkeyPatch, fixture, raises
+
+from synth_a_py import Dir, Project, SimpleFile, SynthSummary
+from synth_a_py.writer import WriterBackend, compare, open_writer
+
+
+@fixture(params=["path", "dirfd"])
+def backend(request: FixtureRequest) -> WriterBackend:
+    return request.param  # type: ignore
+
+
+@fixture(params=["file", "batch"])
+def durability(request: FixtureRequest) -> str:
+    return request.param  # type: ignore
+
+
+def listing(path: Path) -> List[str]:
+    return sorted(p.name for p in path.iterdir())
+
+
+def test_compare(tmp_path: Path) -> None:
+    path = tmp_path / "file.txt"
+
+    assert compare(path, b"content") is None
+
+    path.write_bytes(b"content")
+
+    assert compare(path, b"content") is True
+    assert compare(path, b"changed") is False
+
+
+def test_write(tmp_path: Path, backend: WriterBackend) -> None:
+    path = tmp_path / "dir" / "nested" / "file.txt"
+
+    with open_writer(backend) as writer:
+        writer.makedirs(path.parent)
+        assert writer.write(path, "before")
+        assert writer.write(path, iter(["aft", "er"]))
+
+    assert path.read_text() == "after"
+    assert path.stat().st_mode & 0o777 == 0o444
+
+
+def test_incremental_write(tmp_path: Path, backend: WriterBackend) -> None:
+    path = tmp_path / "file.txt"
+    path.write_text("same\n")
+    path.chmod(0o644)
+
+    with open_writer(backend, incremental=True) as writer:
+        assert not writer.write(path, "same\n")
+        assert not writer.write(path, iter(["sa", "me\n"]))
+        assert writer.write(path, iter(["same\n", "more\n"]))
+        assert writer.write(path, iter(["sa"]))
+
+    assert path.read_text() == "sa"
+    assert path.stat().st_mode & 0o777 == 0o444
+
+
+def test_atomic_write_replaces_file(tmp_path: Path, backend: WriterBackend) -> None:
+    path = tmp_path / "file.txt"
+    with open_writer(backend) as writer:
+        writer.write(path, "before")
+    inode = path.stat().st_ino
+
+    with open_writer(backend, atomic=True) as writer:
+        assert writer.write(path, "after")
+
+    assert path.read_text() == "after"
+    assert path.stat().st_ino != inode
+    assert path.stat().st_mode & 0o777 == 0o444
+    assert listing(tmp_path) == ["file.txt"]
+
+
+def test_atomic_write_failure_keeps_file(
+    tmp_path: Path, backend: WriterBackend
+) -> None:
+    path = tmp_path / "file.txt"
+    with open_writer(backend) as writer:
+        writer.write(path, "before")
+
+    def chunks() -> Iterator[str]:
+        yield "after"
+        raise RuntimeError("render failed")
+
+    with raises(RuntimeError):
+        with open_writer(backend, atomic=True) as writer:
+            writer.write(path, chunks())
+
+    assert path.read_text() == "before"
+    assert listing(tmp_path) == ["file.txt"]
+
+
+def test_atomic_incremental_streamed_write(
+    tmp_path: Path, backend: WriterBackend
+) -> None:
+    path = tmp_path / "file.txt"
+
+    with open_writer(backend, incremental=True, atomic=True) as writer:
+        assert writer.write(path, iter(["same\n", "before\n"]))
+        assert not writer.write(path, iter(["same\n", "before\n"]))
+        assert writer.write(path, iter(["same\n", "after\n"]))
+
+    assert path.read_text() == "same\nafter\n"
+    assert listing(tmp_path) == ["file.txt"]
+
+
+def test_link(tmp_path: Path, backend: WriterBackend) -> None:
+    source = tmp_path / "a" / "file.txt"
+    path = tmp_path / "b" / "file.txt"
+
+    with open_writer(backend, incremental=True) as writer:
+        writer.makedirs(source.parent)
+        writer.makedirs(path.parent)
+        writer.write(source, "same")
+        path.write_text("other")
+
+        assert writer.link(source, path, 4) == (True, 4)
+        assert writer.link(source, path, 4) == (False, 4)
+
+    assert path.read_text() == "same"
+    assert path.stat().st_ino == source.stat().st_ino
+
+
+def test_durability(
+    tmp_path: Path, monkeypatch: MonkeyPatch, backend: WriterBackend, durability: str
+) -> None:
+    synced: List[int] = []
+    fsync = os.fsync
+
+    def counting_fsync(fd: int) -> None:
+        synced.append(fd)
+        fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", counting_fsync)
+
+    spec = Project()
+    with spec:
+        SimpleFile("a.txt", "a")
+        with Dir("dir"):
+            SimpleFile("b.txt", "b")
+            SimpleFile("c.txt", "c")
+
+    summary = spec.synth(
+        tmp_path, atomic=True, durability=durability, writer=backend  # type: ignore
+    )
+
+    assert summary == SynthSummary(written=3, unchanged=0)
+    assert (tmp_path / "dir" / "c.txt").read_text() == "c\n"
+    # each file, then each directory once
+    assert len(synced) == 3 + (2 if os.name != "nt" else 0)
+
+
+def test_batch_durability_renames_after_syncing(
+    tmp_path: Path, monkeypatch: MonkeyPatch, backend: WriterBackend
+) -> None:
+    calls: List[str] = []
+    fsync = os.fsync
+    replace = os.replace
+
+    def recording_fsync(fd: int) -> None:
+        calls.append("fsync")
+        fsync(fd)
+
+    def recording_replace(*args: Any, **kwargs: Any) -> None:
+        calls.append("replace")
+        replace(*args, **kwargs)
+
+    monkeypatch.setattr(os, "fsync", recording_fsync)
+    monkeypatch.setattr(os, "replace", recording_replace)
+
+    (tmp_path / "a.txt").write_text("old\n")
+    with open_writer(backend, atomic=True, durability="batch") as writer:
+        writer.makedirs(tmp_path)
+        writer.write(tmp_path / "a.txt", "a\n")
+        writer.write(tmp_path / "b.txt", iter(["b\n"]))
+        # the old file stays in place until every new one is synced
+        assert (tmp_path / "a.txt").read_text() == "old\n"
+        assert writer.link(tmp_path / "a.txt", tmp_path / "c.txt", 2) == (True, 2)
+
+    assert (tmp_path / "a.txt").read_text() == "a\n"
+    assert (tmp_path / "c.txt").read_text() == "a\n"
+    assert listing(tmp_path) == ["a.txt", "b.txt", "c.txt"]
+    # both files, then the renames, then the directory
+    directory_syncs = 1 if os.name != "nt" else 0
+    assert calls == ["fsync"] * 2 + ["replace"] * 3 + ["fsync"] * directory_syncs
+
+
+def test_no_durability_skips_fsync(
+    tmp_path: Path, monkeypatch: MonkeyPatch, backend: WriterBackend
+) -> None:
+    synced: List[int] = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+
+    spec = Project()
+    with spec:
+        SimpleFile("a.txt", "a")
+
+    spec.synth(tmp_path, atomic=True, writer=backend)
+
+    assert synced == []
+
+
+def test_synth_with_many_directories(
+    tmp_path: Path, monkeypatch: MonkeyPatch, backend: WriterBackend
+) -> None:
+    # more directories than the dirfd writer keeps open at once
+    monkeypatch.setattr("synth_a_py.writer._MAX_OPEN_DIRECTORIES", 2)
+
+    def project(content: str) -> Project:
+        spec = Project()
+        with spec:
+            for i in range(10):
+                with Dir(f"dir{i}"):
+                    SimpleFile("same.txt", "same")
+                    with Dir("nested"):
+                        SimpleFile("file.txt", content)
+        return spec
+
+    project("before").synth(tmp_path, writer=backend, workers=4, dedupe=True)
+    summary = project("after").synth(
+        tmp_path, writer=backend, workers=4, dedupe=True, incremental=True
+    )
+
+    assert summary == SynthSummary(written=10, unchanged=10, bytes_saved=9 * 5 + 9 * 6)
+    for i in range(10):
+        assert (tmp_path / f"dir{i}" / "nested" / "file.txt").read_text() == "after\n"
+        assert (tmp_path / f"dir{i}" / "same.txt").read_text() == "same\n"
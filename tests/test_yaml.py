@@ -1,7 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 from pathlib import Path
 from textwrap import dedent
+from typing import Any, Dict, List
 
-from synth_a_py import Dir, Project, YamlFile
+import pytest
+from ruamel.yaml import YAML
+from ruamel.yaml.scalarstring import walk_tree as insert_multiline_literals_inplace
+
+from synth_a_py import Dir, Project, YamlFile, serializers
+from synth_a_py.yaml import _emit, yaml
 
 
 def test_yaml(tmp_path: Path) -> None:
@@ -77,3 +85,308 @@ def test_yaml(tmp_path: Path) -> None:
                   make test
         """
     )
+
+
+def test_yaml_does_not_modify_obj() -> None:
+    shared_step = {"run": "make lint\nmake test\n"}
+    untouched = {"branches": ["main"]}
+    obj: Dict[str, Any] = {
+        "on": {"push": untouched},
+        "jobs": {
+            "a": {"steps": [shared_step]},
+            "b": {"steps": [shared_step, {"run": "echo done"}]},
+        },
+    }
+    expected = deepcopy(obj)
+    insert_multiline_literals_inplace(expected)
+
+    spec = Project()
+    with spec:
+        f = YamlFile("ci.yaml", obj)
+
+    assert f.synth_content() == yaml.dumps(expected)
+    assert "&id001" in f.synth_content()
+    assert type(shared_step["run"]) is str
+    assert obj["on"]["push"] is untouched
+
+
+def test_yaml_keeps_round_trip_comments() -> None:
+    obj = YAML().load(
+        dedent(
+            """\
+            steps:  # c1
+              - x  # c2
+              - y
+            branches: [main, dev]
+            """
+        )
+    )
+    obj["steps"].append("m\nl")
+    obj["branches"].append("a\nb")
+
+    spec = Project()
+    with spec:
+        f = YamlFile("ci.yaml", obj)
+
+    assert f.synth_content() == dedent(
+        """\
+        steps:  # c1
+          - x  # c2
+          - y
+          - |-
+            m
+            l
+        branches: [main, dev, "a\\nb"]
+        """
+    )
+    assert list(obj["steps"].ca.items) == [0]
+
+
+def test_yaml_chunks() -> None:
+    mapping = {"a": [1, {"b": "x\ny\n"}], "c": {"d": [[1, 2], [3]]}, "e": None}
+    sequence = [{"a": 1, "b": [1, 2]}, "x", [1, [2]]]
+    shared = {"run": "make"}
+    with_anchors = {"a": shared, "b": shared}
+
+    spec = Project()
+    with spec:
+        files = [
+            YamlFile("mapping.yaml", mapping),
+            YamlFile("sequence.yaml", sequence),
+            YamlFile("anchors.yaml", with_anchors),
+        ]
+
+    for f in files:
+        expected = deepcopy(f.obj)
+        insert_multiline_literals_inplace(expected)
+        assert f.synth_content() == yaml.dumps(expected)
+
+    assert len(list(files[0].synth_chunks())) == 3
+    assert len(list(files[1].synth_chunks())) == 3
+    assert len(list(files[2].synth_chunks())) == 1
+
+
+def test_yaml_top_level_string() -> None:
+    spec = Project()
+    with spec:
+        f = YamlFile("file.yaml", "a\nb")
+
+    assert f.synth_content() == yaml.dumps("a\nb")
+    assert YAML().load(f.synth_content()) == "a\nb"
+
+
+def test_yaml_chunks_keep_literal() -> None:
+    obj = {"script": "echo hi\n\n", "steps": ["a\n\n", "b\n\n"], "name": "ci"}
+
+    spec = Project()
+    with spec:
+        f = YamlFile("ci.yaml", obj)
+
+    expected = deepcopy(obj)
+    insert_multiline_literals_inplace(expected)
+    assert len(list(f.synth_chunks())) == 3
+    assert f.synth_content() == yaml.dumps(expected)
+    assert YAML().load(f.synth_content()) == obj
+
+
+def test_yaml_rendered_concurrently() -> None:
+    spec = Project()
+    with spec:
+        files = [
+            YamlFile(
+                f"{i}.yaml",
+                {
+                    "i": i,
+                    "items": [
+                        {"n": n, "run": f"echo {n}\necho {i}"} for n in range(50)
+                    ],
+                },
+            )
+            for i in range(40)
+        ]
+    expected = [f.synth_content() for f in files]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        rendered = list(executor.map(lambda f: f.synth_content(), files))
+
+    assert rendered == expected
+
+
+def test_yaml_emitter_per_thread() -> None:
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        emitters = set(executor.map(lambda _: id(yaml._YAML__yaml), range(2)))
+    emitters.add(id(yaml._YAML__yaml))
+
+    assert len(emitters) > 1
+
+
+def _checkout(**with_: Any) -> Dict[str, Any]:
+    step: Dict[str, Any] = {"uses": "actions/checkout@v2"}
+    if with_:
+        step["with"] = with_
+    return step
+
+
+WORKFLOWS: List[Any] = [
+    {
+        "name": "ci",
+        "on": {"pull_request": {"branches": ["main"]}, "push": {"branches": ["main"]}},
+        "jobs": {
+            "test": {
+                "runs-on": "${{ matrix.os }}",
+                "strategy": {
+                    "fail-fast": False,
+                    "matrix": {
+                        "os": ["ubuntu-latest", "macos-latest", "windows-latest"],
+                        "python-version": ["3.6", "3.7", "3.8", "3.9", "3.10"],
+                        "include": [{"os": "ubuntu-latest", "experimental": True}],
+                    },
+                },
+                "steps": [
+                    _checkout(),
+                    {
+                        "name": "Set up Python ${{ matrix.python-version }}",
+                        "uses": "actions/setup-python@v2",
+                        "with": {"python-version": "${{ matrix.python-version }}"},
+                    },
+                    {"run": "pip install poetry\npoetry install\n"},
+                    {"run": "make lint test"},
+                ],
+            },
+        },
+    },
+    {
+        "name": "release",
+        "on": {"push": {"tags": ["v*"]}},
+        "env": {"PYTHONUNBUFFERED": "1", "POETRY_VERSION": "1.1.4"},
+        "jobs": {
+            "publish": {
+                "runs-on": "ubuntu-latest",
+                "if": "github.repository == 'eganjs/synth-a-py'",
+                "steps": [
+                    _checkout(**{"fetch-depth": 0}),
+                    {
+                        "name": "Build",
+                        "run": 'poetry build\necho "built $(ls dist)"',
+                    },
+                    {
+                        "name": "Publish",
+                        "run": "poetry publish --username __token__ --password $PYPI",
+                        "env": {"PYPI": "${{ secrets.PYPI_TOKEN }}"},
+                    },
+                ],
+            },
+        },
+    },
+    {
+        "name": "CodeQL",
+        "on": {
+            "schedule": [{"cron": "0 6 * * 1"}],
+            "workflow_dispatch": {},
+            "pull_request": None,
+        },
+        "permissions": {"contents": "read", "security-events": "write"},
+        "jobs": {
+            "analyze": {
+                "runs-on": "ubuntu-latest",
+                "timeout-minutes": 30,
+                "steps": [
+                    _checkout(),
+                    {
+                        "uses": "github/codeql-action/init@v1",
+                        "with": {"languages": "python"},
+                    },
+                    {"uses": "github/codeql-action/analyze@v1"},
+                ],
+            },
+        },
+    },
+    {
+        "name": "pages",
+        "on": {"push": {"branches": ["main"], "paths": ["docs/**", "!docs/*.tmp"]}},
+        "concurrency": {"group": "pages", "cancel-in-progress": True},
+        "jobs": {
+            "deploy": {
+                "runs-on": "ubuntu-20.04",
+                "environment": {
+                    "name": "github-pages",
+                    "url": "${{ steps.deploy.outputs.page_url }}",
+                },
+                "steps": [
+                    _checkout(submodules="recursive"),
+                    {
+                        "run": "cat <<'EOF' > docs/_config.yml\n"
+                        "title: synth-a-py\n\ntheme: minima\nEOF\n\n\n"
+                    },
+                    {"id": "deploy", "uses": "actions/deploy-pages@v1"},
+                ],
+            },
+        },
+    },
+    {
+        "name": "notes",
+        "on": "push",
+        "jobs": {
+            "notes": {"steps": [{"run": "echo start\n\n"}, {"run": "echo end\n\n"}]}
+        },
+    },
+    [
+        {"name": "bug", "color": "d73a4a", "description": "Something isn't working"},
+        {"name": "good first issue", "color": "7057ff", "description": ""},
+        {"name": "123", "color": "008672", "description": "null"},
+    ],
+]
+
+
+@pytest.mark.parametrize("obj", WORKFLOWS)
+def test_yaml_fast(obj: Any) -> None:
+    spec = Project()
+    with spec:
+        fast = YamlFile("fast.yaml", obj, serializer="fast")
+        ruamel = YamlFile("ruamel.yaml", obj)
+
+    assert _emit(obj) is not None
+    assert fast.synth_content() == ruamel.synth_content()
+    assert fast.cache_key() != ruamel.cache_key()
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {"a": [[1, [2, {"b": "c"}]], [], {}], "d": [{"e": {"f": [None]}}]},
+        {"shared": [{"a": 1}] * 2},
+        {"long": " ".join(["word"] * 30), "longer": "x" * 90},
+        {1: "a", None: "b"},
+        {"a": (1, 2)},
+        {"a": float("inf"), "b": 1e20},
+        {"a": "  leading\nspace", "b": "\ttab\nx", "c": "\u2028"},
+        {"a": 'it\'s: "quoted"'},
+        "scalar",
+        [],
+    ],
+)
+def test_yaml_fast_falls_back(obj: Any) -> None:
+    spec = Project()
+    with spec:
+        fast = YamlFile("fast.yaml", obj, serializer="fast")
+        ruamel = YamlFile("ruamel.yaml", obj)
+
+    assert _emit(obj) is None
+    assert fast.synth_content() == ruamel.synth_content()
+
+
+def test_yaml_serializer_default() -> None:
+    obj = {"a": [1, 2], "b": None}
+
+    spec = Project()
+    with spec:
+        f = YamlFile("file.yaml", obj)
+
+    serializers.set_default("yaml", "fast")
+    try:
+        assert f.synth_content() == "a:\n  - 1\n  - 2\nb:\n"
+        assert len(list(f.synth_chunks())) == 1
+    finally:
+        serializers.set_default("yaml", "ruamel")
+
+    assert len(list(f.synth_chunks())) == 2